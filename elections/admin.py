@@ -1,12 +1,26 @@
 from django.contrib import admin
-from .models import Institution, Campus, Faculty, Person, Election, Candidate, ElectorRegistry
+from .models import Institution, Campus, Faculty, Person, Election, Candidate, ElectorRegistry, EligibleElector
 
 # Register your models here.
 
+
+class CandidateAdmin(admin.ModelAdmin):
+    list_select_related = ('person', 'election_id')
+
+
+class ElectorRegistryAdmin(admin.ModelAdmin):
+    list_select_related = ('ci', 'election_id')
+
+
+class EligibleElectorAdmin(admin.ModelAdmin):
+    list_select_related = ('ci', 'election_id')
+
+
 admin.site.register(Institution)
 admin.site.register(Campus)
 admin.site.register(Faculty)
 admin.site.register(Person)
 admin.site.register(Election)
-admin.site.register(Candidate)
-admin.site.register(ElectorRegistry)
+admin.site.register(Candidate, CandidateAdmin)
+admin.site.register(ElectorRegistry, ElectorRegistryAdmin)
+admin.site.register(EligibleElector, EligibleElectorAdmin)
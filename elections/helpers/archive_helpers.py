@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from elections.helpers.ledger_helpers import fold_ballot_ledger
+from elections.helpers.tally_helpers import is_ledger_tally, is_sharded_tally, sync_candidate_totals
+from elections.models import Candidate, CandidateLog
+from user_management.models import CustomUser, CustomUserLog
+
+CANDIDATE_LOG_FIELDS = ('person', 'election_id', 'biography', 'who_added', 'staff_votes', 'president_votes',
+                        'position')
+CUSTOM_USER_LOG_FIELDS = ('person', 'username', 'date_joined', 'is_staff', 'is_superuser', 'election_id')
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def copy_rows(model, log_model, fields, pks):
+    """``INSERT INTO log ... SELECT ... FROM live WHERE pk IN pks``: copy rows without loading them."""
+    qn = connection.ops.quote_name
+    target = ', '.join(qn(log_model._meta.get_field(field).column) for field in fields)
+    source = ', '.join(qn(model._meta.get_field(field).column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(log_model._meta.db_table)} ({target}) '
+            f'SELECT {source} FROM {qn(model._meta.db_table)} '
+            f'WHERE {qn(model._meta.pk.column)} IN ({", ".join(["%s"] * len(pks))})',
+            pks,
+        )
+
+
+def move_rows(queryset, log_model, fields, chunk_size, progress=None):
+    """
+    Move the rows of ``queryset`` into ``log_model`` ``chunk_size`` at a
+    time. Each chunk locks its rows, copies them with one ``INSERT ... SELECT``
+    and deletes them in its own short transaction, so a failure leaves only
+    whole chunks moved and a rerun picks up where it stopped. Returns the
+    number of rows moved.
+    """
+    model = queryset.model
+    total = queryset.count()
+    moved = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.order_by('pk').select_for_update().values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return moved
+            copy_rows(model, log_model, fields, pks)
+            model.objects.filter(pk__in=pks).delete()
+        moved += len(pks)
+        if progress is not None:
+            progress(model, moved, total)
+
+
+def archive_election(election, chunk_size=None, force=False, progress=None):
+    """
+    Close the books of ``election``: its candidates, with their final totals,
+    go to ``CandidateLog`` and its committee users (every non-superuser bound
+    to it) to ``CustomUserLog``; the live rows are deleted. Votes still in the
+    sharded counters or the ballot ledger are folded into the candidates
+    first. Active elections are refused unless ``force`` is set.
+
+    Returns ``(candidates, users)`` moved.
+    """
+    if election.is_active and not force:
+        raise ArchiveError(f'Election {election.pk} is still active')
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    if is_sharded_tally():
+        sync_candidate_totals(election.pk)
+    elif is_ledger_tally():
+        fold_ballot_ledger(lag_seconds=0)
+
+    candidates = move_rows(Candidate.objects.filter(election_id=election), CandidateLog, CANDIDATE_LOG_FIELDS,
+                           chunk_size, progress)
+    users = move_rows(CustomUser.objects.filter(election_id=election, is_superuser=False), CustomUserLog,
+                      CUSTOM_USER_LOG_FIELDS, chunk_size, progress)
+    return candidates, users
@@ -0,0 +1,228 @@
+from collections import defaultdict
+
+import jwt
+from django.db import connection, transaction
+from rest_framework import status
+
+from elections.helpers.eligibility_helpers import eligible_keys, is_eligibility_enforced
+from elections.helpers.ledger_helpers import append_ballot, append_ballots
+from elections.helpers.results_helpers import invalidate_election_results
+from elections.helpers.tally_helpers import add_votes, is_ledger_tally, parse_candidate_votes
+from elections.helpers.token_helpers import consume_ballot_tokens, replay_filter, verify_ballot_token
+from elections.models import Election, ElectorRegistry, EligibleElector, Person
+
+
+class BallotError(Exception):
+    status_code = status.HTTP_400_BAD_REQUEST
+    code = 'rejected'
+    default_message = 'Ballot rejected'
+
+    def __init__(self, message=None):
+        self.message = message or self.default_message
+        super().__init__(self.message)
+
+
+class DuplicateBallotError(BallotError):
+    status_code = status.HTTP_409_CONFLICT
+    code = 'duplicate'
+    default_message = 'Elector has already voted in this election'
+
+
+class UnknownElectorError(BallotError):
+    status_code = status.HTTP_404_NOT_FOUND
+    code = 'not_found'
+    default_message = 'Elector or election not found'
+
+
+class IneligibleElectorError(BallotError):
+    status_code = status.HTTP_403_FORBIDDEN
+    code = 'ineligible'
+    default_message = 'Elector is not eligible in this election'
+
+
+class InvalidBallotTokenError(BallotError):
+    status_code = status.HTTP_401_UNAUTHORIZED
+    code = 'invalid'
+    default_message = 'Invalid token'
+
+
+class ExpiredBallotTokenError(InvalidBallotTokenError):
+    code = 'expired'
+    default_message = 'Token has expired'
+
+
+class ReplayedBallotTokenError(BallotError):
+    status_code = status.HTTP_409_CONFLICT
+    code = 'replayed'
+    default_message = 'Token has already been used'
+
+
+def decode_ballot_token(token):
+    """
+    Verify a signed ballot token and return
+    ``(elector_ci, election_id, candidate_votes, jti)``. Tokens whose ``jti``
+    was already consumed are rejected before touching the database for writing.
+    """
+    try:
+        data = verify_ballot_token(token)
+    except jwt.ExpiredSignatureError:
+        raise ExpiredBallotTokenError()
+    except jwt.InvalidTokenError:
+        raise InvalidBallotTokenError()
+
+    try:
+        jti = str(data['jti']) if data.get('jti') is not None else None
+        ballot = (str(data['elector']['ci']), int(data['elector']['election_id']),
+                  parse_candidate_votes(data['candidates']), jti)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise InvalidBallotTokenError('Invalid token payload')
+
+    if jti and replay_filter.is_consumed(jti):
+        raise ReplayedBallotTokenError()
+    return ballot
+
+
+def claim_elector_registry(elector_ci, election_id):
+    """
+    Insert the ``(ci, election_id)`` registry row in a single statement.
+
+    The row is only inserted when both the person and the election exist, or,
+    with ``ENFORCE_ELIGIBILITY``, when the pair is on the eligibility roll of
+    the election, and ``ON CONFLICT DO NOTHING`` on ``unique_elector_registry`` makes racing
+    ballots of the same elector lose cleanly. Returns the new registry id, or
+    ``None`` when nothing was inserted.
+    """
+    qn = connection.ops.quote_name
+    ci_column = qn(ElectorRegistry._meta.get_field('ci').column)
+    election_column = qn(ElectorRegistry._meta.get_field('election_id').column)
+    if is_eligibility_enforced():
+        # Sonda sobre el indice unico (election_id, ci) del padron
+        source = (f'SELECT {ci_column}, {election_column} FROM {qn(EligibleElector._meta.db_table)} '
+                  f'WHERE {ci_column} = %s AND {election_column} = %s')
+    else:
+        person_pk = qn(Person._meta.pk.column)
+        election_pk = qn(Election._meta.pk.column)
+        source = (f'SELECT p.{person_pk}, e.{election_pk} '
+                  f'FROM {qn(Person._meta.db_table)} p, {qn(Election._meta.db_table)} e '
+                  f'WHERE p.{person_pk} = %s AND e.{election_pk} = %s')
+    sql = (
+        f'INSERT INTO {qn(ElectorRegistry._meta.db_table)} ({ci_column}, {election_column}) {source} '
+        f'ON CONFLICT ({ci_column}, {election_column}) DO NOTHING RETURNING {qn("id")}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [elector_ci, election_id])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def commit_ballot(elector_ci, election_id, candidate_votes, jti=None):
+    """
+    Record a ballot in one transaction: claim the elector registry row and,
+    only if the claim succeeds, append it to the ballot ledger and apply all
+    candidate increments in one UPDATE. In ``ledger`` tally mode the increments
+    are left to ``fold_ballot_ledger``.
+
+    Duplicate or racing ballots raise ``DuplicateBallotError`` before any
+    tally is touched; with ``ENFORCE_ELIGIBILITY``, electors missing from the
+    roll raise ``IneligibleElectorError``. The token ``jti``, if any, is marked as consumed
+    and the cached results of the election are marked out of date on commit.
+    Returns the registry id.
+    """
+    with transaction.atomic():
+        registry_id = claim_elector_registry(elector_ci, election_id)
+        if registry_id is None:
+            if ElectorRegistry.objects.filter(ci_id=elector_ci, election_id_id=election_id).exists():
+                raise DuplicateBallotError()
+            if (is_eligibility_enforced() and Person.objects.filter(ci=elector_ci).exists()
+                    and Election.objects.filter(pk=election_id).exists()):
+                raise IneligibleElectorError()
+            raise UnknownElectorError()
+        consume_ballot_tokens([jti])
+        append_ballot(election_id, candidate_votes)
+        if not is_ledger_tally():
+            add_votes(candidate_votes)
+        invalidate_election_results([election_id])
+    return registry_id
+
+
+def claim_elector_registries(keys):
+    """
+    Insert the ``(ci, election_id)`` registry rows of ``keys`` in one statement
+    and return the set of keys that were actually claimed; rows that already
+    exist are skipped by ``ON CONFLICT DO NOTHING``.
+    """
+    if not keys:
+        return set()
+    qn = connection.ops.quote_name
+    ci_column = qn(ElectorRegistry._meta.get_field('ci').column)
+    election_column = qn(ElectorRegistry._meta.get_field('election_id').column)
+    sql = (
+        f'INSERT INTO {qn(ElectorRegistry._meta.db_table)} ({ci_column}, {election_column}) '
+        f'VALUES {", ".join(["(%s, %s)"] * len(keys))} '
+        f'ON CONFLICT ({ci_column}, {election_column}) DO NOTHING RETURNING {ci_column}, {election_column}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for key in keys for value in key])
+        return {(ci, election_id) for ci, election_id in cursor.fetchall()}
+
+
+def commit_ballots(ballots):
+    """
+    Set-based version of ``commit_ballot`` for a batch of decoded ballots.
+
+    ``ballots`` holds ``(elector_ci, election_id, candidate_votes, jti)`` tuples, or
+    ``BallotError`` instances for ballots that already failed verification.
+    Electors and elections are checked with one query each, as unknown like
+    in ``commit_ballot`` (plus one query on the eligibility rolls with
+    ``ENFORCE_ELIGIBILITY`` for the known ones), registry rows are
+    claimed with one INSERT, and the tallies of every accepted ballot are
+    applied with one grouped UPDATE, all in a single transaction. The cached
+    results of the elections voted in are marked out of date on commit.
+
+    Returns one entry per ballot: the ``(elector_ci, election_id)`` key when
+    accepted, or the ``BallotError`` that rejected it.
+    """
+    results = list(ballots)
+    pending = {}
+    for index, ballot in enumerate(ballots):
+        if isinstance(ballot, BallotError):
+            continue
+        key = ballot[:2]
+        if key in pending:
+            results[index] = DuplicateBallotError()
+            continue
+        pending[key] = index
+    if not pending:
+        return results
+
+    people = set(Person.objects.filter(ci__in={ci for ci, _ in pending}).values_list('ci', flat=True))
+    elections = set(Election.objects.filter(pk__in={election_id for _, election_id in pending})
+                    .values_list('pk', flat=True))
+    for key in [key for key in pending if key[0] not in people or key[1] not in elections]:
+        results[pending.pop(key)] = UnknownElectorError()
+    if pending and is_eligibility_enforced():
+        eligible = eligible_keys(list(pending))
+        for key in [key for key in pending if key not in eligible]:
+            results[pending.pop(key)] = IneligibleElectorError()
+
+    with transaction.atomic():
+        claimed = claim_elector_registries(list(pending))
+        totals = defaultdict(lambda: [0, 0])
+        accepted = []
+        jtis = []
+        for key, index in pending.items():
+            if key not in claimed:
+                results[index] = DuplicateBallotError()
+                continue
+            elector_ci, election_id, candidate_votes, jti = ballots[index]
+            accepted.append((election_id, candidate_votes))
+            jtis.append(jti)
+            for pk, (staff_votes, president_votes) in candidate_votes.items():
+                totals[pk][0] += staff_votes
+                totals[pk][1] += president_votes
+        consume_ballot_tokens(jtis)
+        append_ballots(accepted)
+        if not is_ledger_tally():
+            add_votes(totals)
+        invalidate_election_results([election_id for election_id, _ in accepted])
+    return results
@@ -0,0 +1,70 @@
+from django.db import transaction
+
+from elections.helpers.eligibility_helpers import add_people_to_rolls
+from elections.models import Candidate, Election, Faculty, Person
+from elections.serializers import SlateCandidateSerializer
+
+
+def register_candidates(rows):
+    """
+    Register a slate of candidates in a fixed number of queries, whatever its
+    size: rows are validated in memory, elections, faculties, people and
+    existing candidacies are checked with one query each, the people not yet
+    on the roll are inserted with one ``INSERT ... ON CONFLICT DO NOTHING``
+    (existing people are kept as they are, like ``get_or_create``) and added
+    to the eligibility rolls in scope with one ``INSERT ... SELECT``, and the
+    candidates are inserted with one ``bulk_create``, in a single transaction.
+
+    Returns one entry per row: ``{'status': 'created', 'ci': ...}``, or the
+    rejection with ``status`` ``invalid``, ``duplicate`` or ``not_found``.
+    """
+    results = [None] * len(rows)
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = SlateCandidateSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = {'status': 'invalid', 'errors': serializer.errors}
+            continue
+        ci = serializer.validated_data['person']['ci']
+        if ci in valid:
+            results[index] = {'status': 'duplicate', 'ci': ci, 'error': 'Person is twice in the slate'}
+            continue
+        valid[ci] = (index, serializer.validated_data)
+    if not valid:
+        return results
+
+    elections = set(Election.objects.filter(pk__in={data['election_id'] for _, data in valid.values()})
+                    .values_list('pk', flat=True))
+    faculty_ids = {data['person'].get('faculty_id') for _, data in valid.values()} - {None}
+    faculties = set(Faculty.objects.filter(pk__in=faculty_ids).values_list('pk', flat=True)) if faculty_ids else set()
+    candidates = set(Candidate.objects.filter(person_id__in=valid).values_list('person_id', flat=True))
+    for ci, (index, data) in list(valid.items()):
+        if ci in candidates:
+            results[index] = {'status': 'duplicate', 'ci': ci, 'error': 'Person is already a candidate'}
+        elif data['election_id'] not in elections:
+            results[index] = {'status': 'not_found', 'ci': ci, 'error': 'Election not found'}
+        elif data['person'].get('faculty_id') not in faculties | {None}:
+            results[index] = {'status': 'not_found', 'ci': ci, 'error': 'Faculty not found'}
+        else:
+            continue
+        del valid[ci]
+    if not valid:
+        return results
+
+    people = set(Person.objects.filter(ci__in=valid).values_list('ci', flat=True))
+    new_people = [Person(ci=ci, name=data['person']['name'], last_name=data['person']['last_name'],
+                         faculty_id_id=data['person'].get('faculty_id'))
+                  for ci, (_, data) in valid.items() if ci not in people]
+    with transaction.atomic():
+        if new_people:
+            Person.objects.bulk_create(new_people, ignore_conflicts=True)
+            # bulk_create no emite post_save: solo las personas nuevas entran en los padrones
+            add_people_to_rolls([person.ci for person in new_people])
+        Candidate.objects.bulk_create([
+            Candidate(person_id=ci, election_id_id=data['election_id'], biography=data.get('biography'),
+                      who_added=data['who_added'], position=data.get('position'))
+            for ci, (_, data) in valid.items()
+        ])
+    for ci, (index, _) in valid.items():
+        results[index] = {'status': 'created', 'ci': ci}
+    return results
@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from elections.models import Campus, Election, EligibleElector, Faculty, Person
+
+
+def is_eligibility_enforced():
+    return settings.ENFORCE_ELIGIBILITY
+
+
+def scope_sql(election_type):
+    """
+    ``FROM ... WHERE`` clause selecting the persons in the scope of an
+    election of ``election_type``, with the location id as only parameter.
+    Unknown types are faculty elections, like ``Election.type`` always did.
+    """
+    qn = connection.ops.quote_name
+    persons = f'{qn(Person._meta.db_table)} p'
+    person_faculty = f'p.{qn(Person._meta.get_field("faculty_id").column)}'
+    faculties = f'{qn(Faculty._meta.db_table)} f ON f.{qn("id")} = {person_faculty}'
+    faculty_campus = f'f.{qn(Faculty._meta.get_field("campus_id").column)}'
+    if election_type == 'institution':
+        campuses = f'{qn(Campus._meta.db_table)} c ON c.{qn("id")} = {faculty_campus}'
+        institution = f'c.{qn(Campus._meta.get_field("institution_id").column)}'
+        return f'FROM {persons} JOIN {faculties} JOIN {campuses} WHERE {institution} = %s'
+    if election_type == 'campus':
+        return f'FROM {persons} JOIN {faculties} WHERE {faculty_campus} = %s'
+    return f'FROM {persons} WHERE {person_faculty} = %s'
+
+
+def generate_eligibility_roll(election):
+    """
+    Add every person in the scope of ``election`` to its eligibility roll with
+    one ``INSERT ... SELECT``; people already on it are kept. Returns the
+    number of people added.
+    """
+    qn = connection.ops.quote_name
+    table = qn(EligibleElector._meta.db_table)
+    ci_column = qn(EligibleElector._meta.get_field('ci').column)
+    election_column = qn(EligibleElector._meta.get_field('election_id').column)
+    sql = (
+        f'INSERT INTO {table} ({election_column}, {ci_column}, {qn("added_at")}) '
+        f'SELECT %s, p.{qn(Person._meta.pk.column)}, %s {scope_sql(election.type)} '
+        f'ON CONFLICT ({election_column}, {ci_column}) DO NOTHING'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [election.pk, timezone.now(), election.location_id])
+        return cursor.rowcount
+
+
+def refresh_eligibility_roll(election):
+    """
+    Bring the roll of ``election`` in line with where people are now: remove
+    those who left its scope and add those who entered it, both set-based.
+    Returns ``(added, removed)``.
+    """
+    qn = connection.ops.quote_name
+    ci_column = qn(EligibleElector._meta.get_field('ci').column)
+    election_column = qn(EligibleElector._meta.get_field('election_id').column)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {qn(EligibleElector._meta.db_table)} '
+                f'WHERE {election_column} = %s AND {ci_column} NOT IN '
+                f'(SELECT p.{qn(Person._meta.pk.column)} {scope_sql(election.type)})',
+                [election.pk, election.location_id],
+            )
+            removed = cursor.rowcount
+        added = generate_eligibility_roll(election)
+    return added, removed
+
+
+def add_people_to_rolls(cis):
+    """
+    Add the people ``cis`` (typically just created) to the rolls of every
+    election that already has one and whose scope holds them, with one
+    ``INSERT ... SELECT``. Returns the number of roll entries added.
+    """
+    if not cis:
+        return 0
+    qn = connection.ops.quote_name
+    table = qn(EligibleElector._meta.db_table)
+    ci_column = qn(EligibleElector._meta.get_field('ci').column)
+    election_column = qn(EligibleElector._meta.get_field('election_id').column)
+    person_pk = qn(Person._meta.pk.column)
+    person_faculty = f'p.{qn(Person._meta.get_field("faculty_id").column)}'
+    faculty_campus = f'f.{qn(Faculty._meta.get_field("campus_id").column)}'
+    campus_institution = f'c.{qn(Campus._meta.get_field("institution_id").column)}'
+    election_type = f'e.{qn(Election._meta.get_field("type").column)}'
+    election_location = f'e.{qn(Election._meta.get_field("location_id").column)}'
+    election_pk = qn(Election._meta.pk.column)
+    sql = (
+        f'INSERT INTO {table} ({election_column}, {ci_column}, {qn("added_at")}) '
+        f'SELECT e.{election_pk}, p.{person_pk}, %s FROM {qn(Person._meta.db_table)} p '
+        f'JOIN {qn(Faculty._meta.db_table)} f ON f.{qn("id")} = {person_faculty} '
+        f'JOIN {qn(Campus._meta.db_table)} c ON c.{qn("id")} = {faculty_campus} '
+        f'JOIN {qn(Election._meta.db_table)} e ON '
+        f"(({election_type} = 'institution' AND {election_location} = {campus_institution}) "
+        f"OR ({election_type} = 'campus' AND {election_location} = {faculty_campus}) "
+        f"OR ({election_type} NOT IN ('institution', 'campus') AND {election_location} = {person_faculty})) "
+        f'WHERE p.{person_pk} IN ({", ".join(["%s"] * len(cis))}) '
+        f'AND EXISTS (SELECT 1 FROM {table} r WHERE r.{election_column} = e.{election_pk}) '
+        f'ON CONFLICT ({election_column}, {ci_column}) DO NOTHING'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [timezone.now(), *cis])
+        return cursor.rowcount
+
+
+def elections_with_roll():
+    return Election.objects.filter(pk__in=EligibleElector.objects.values('election_id'))
+
+
+def refresh_eligibility_rolls(elections=None):
+    """Refresh the roll of every election that has one. Returns ``(added, removed)``."""
+    added = removed = 0
+    for election in elections if elections is not None else elections_with_roll():
+        election_added, election_removed = refresh_eligibility_roll(election)
+        added += election_added
+        removed += election_removed
+    return added, removed
+
+
+def refresh_person_eligibility(person):
+    """
+    Incremental refresh for one person whose faculty changed: drop them from
+    the rolls of elections no longer in scope and add them to the rolls of the
+    ones that are. Only elections that already have a roll are touched.
+    """
+    in_scope = set()
+    if person.faculty_id_id is not None:
+        faculty = Faculty.objects.select_related('campus_id').get(pk=person.faculty_id_id)
+        scope = (Q(type='institution', location_id=faculty.campus_id.institution_id_id)
+                 | Q(type='campus', location_id=faculty.campus_id_id)
+                 | (~Q(type__in=['institution', 'campus']) & Q(location_id=faculty.pk)))
+        in_scope = set(elections_with_roll().filter(scope).values_list('pk', flat=True))
+    EligibleElector.objects.filter(ci=person).exclude(election_id__in=in_scope).delete()
+    EligibleElector.objects.bulk_create([EligibleElector(ci=person, election_id_id=pk) for pk in in_scope],
+                                        ignore_conflicts=True)
+
+
+def eligible_keys(keys):
+    """The ``(ci, election_id)`` pairs of ``keys`` on an eligibility roll, in one query."""
+    if not keys:
+        return set()
+    condition = Q(pk__in=[])
+    for ci, election_id in keys:
+        condition |= Q(ci_id=ci, election_id_id=election_id)
+    return set(EligibleElector.objects.filter(condition).values_list('ci_id', 'election_id_id'))
@@ -0,0 +1,138 @@
+import csv
+import io
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from elections.helpers.json_helpers import dumps
+from elections.helpers.tally_helpers import is_sharded_tally
+from elections.models import Candidate, ElectorRegistry, EligibleElector, Person
+from elections.permissions import IsSuperUser
+
+EXPORT_FORMATS = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+# Celdas que una hoja de cálculo evaluaría como fórmula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Export:
+    """
+    One exportable table: the model, the ``{column: field}`` pairs written
+    for each row and the indexed ordering the rows are read in.
+    """
+
+    def __init__(self, name, model, columns, ordering):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.ordering = ordering
+
+    def rows(self, queryset):
+        """Tuples of ``queryset`` in export order, read from a server-side cursor."""
+        fields = self.columns.values()
+        if self.model is Candidate and is_sharded_tally():
+            queryset = queryset.with_vote_totals()
+            fields = [f'{field}_total' if field in ('staff_votes', 'president_votes') else field for field in fields]
+        return (queryset.order_by(*self.ordering).values_list(*fields)
+                .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE))
+
+
+EXPORTS = {export.name: export for export in (
+    Export('persons', Person, {'ci': 'ci', 'name': 'name', 'last_name': 'last_name', 'faculty_id': 'faculty_id'},
+           ['ci']),
+    Export('elector-registries', ElectorRegistry, {'id': 'id', 'ci': 'ci', 'election_id': 'election_id'}, ['id']),
+    Export('candidates', Candidate,
+           {'ci': 'person_id', 'name': 'person__name', 'last_name': 'person__last_name',
+            'election_id': 'election_id', 'position': 'position', 'who_added': 'who_added',
+            'staff_votes': 'staff_votes', 'president_votes': 'president_votes'},
+           ['person_id']),
+    Export('eligible-electors', EligibleElector, {'election_id': 'election_id', 'ci': 'ci', 'added_at': 'added_at'},
+           ['election_id', 'ci']),
+)}
+
+
+def escape_csv_cell(value):
+    """Prefix text that a spreadsheet would run as a formula with ``'`` so it is read as text."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_csv(columns, rows, chunk_size=None):
+    """
+    CSV bytes of ``rows`` under a ``columns`` header, one chunk every
+    ``chunk_size`` rows, with formula-like text cells escaped.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([escape_csv_cell(value) for value in row])
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_ndjson(columns, rows, chunk_size=None):
+    """One JSON object per line for each of ``rows``, one chunk every ``chunk_size`` rows."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    chunk = []
+    for row in rows:
+        chunk.append(dumps(dict(zip(columns, row))))
+        if len(chunk) >= chunk_size:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+
+def iter_gzip(chunks):
+    """Compress a stream of byte chunks into one gzip member as it is consumed."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(export, queryset, output='csv', compress=False):
+    """Encoded chunks of ``export`` restricted to ``queryset``, in ``output`` format."""
+    encode = iter_ndjson if output == 'ndjson' else iter_csv
+    chunks = encode(list(export.columns), export.rows(queryset))
+    return iter_gzip(chunks) if compress else chunks
+
+
+def export_response(request, export, queryset):
+    """
+    Stream ``export`` restricted to ``queryset`` as a file download, in the
+    format of ``?output=`` (``csv`` or ``ndjson``), gzipped with ``?gzip=true``.
+    """
+    output = request.query_params.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        raise ValidationError({'output': f'Choose one of: {", ".join(EXPORT_FORMATS)}'})
+    compress = request.query_params.get('gzip') in ('true', '1')
+    response = StreamingHttpResponse(iter_export(export, queryset, output, compress),
+                                     content_type='application/gzip' if compress else EXPORT_FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="{export.name}.{output}{".gz" if compress else ""}"'
+    return response
+
+
+class ExportMixin:
+    """
+    ``GET export/``: every row of the ``export_name`` table matching the view
+    filters, streamed from a server-side cursor with memory bounded by
+    ``EXPORT_CHUNK_SIZE`` rows whatever the size of the table. Superusers only.
+    """
+    export_name = None
+
+    @action(detail=False, methods=['get'], permission_classes=[IsSuperUser])
+    def export(self, request):
+        export = EXPORTS[self.export_name]
+        # Sin get_queryset: la exportación elige sus propias columnas y anotaciones
+        return export_response(request, export, self.filter_queryset(export.model.objects.all()))
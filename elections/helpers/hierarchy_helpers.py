@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from elections.helpers.json_helpers import dumps
+from elections.helpers.version_helpers import get_model_versions
+from elections.models import Campus, ElectorRegistry, Faculty, Institution, Person
+
+HIERARCHY_MODELS = (Institution, Campus, Faculty)
+HIERARCHY_CACHE_KEY = 'hierarchy-tree:{}:{}'
+
+
+def build_hierarchy_tree(with_counts=False):
+    """
+    Institutions with their campuses and faculties nested, in three queries.
+    ``with_counts`` adds to every node the persons assigned to it and their
+    elector registry entries, summed up the tree, in two more queries.
+    """
+    tree = [{'id': pk, 'name': name, 'campuses': []}
+            for pk, name in Institution.objects.order_by('id').values_list('id', 'name')]
+    institutions = {node['id']: node for node in tree}
+    campuses = {}
+    for pk, name, institution_id in Campus.objects.order_by('id').values_list('id', 'name', 'institution_id'):
+        campuses[pk] = {'id': pk, 'name': name, 'faculties': []}
+        institutions[institution_id]['campuses'].append(campuses[pk])
+    for pk, name, campus_id in Faculty.objects.order_by('id').values_list('id', 'name', 'campus_id'):
+        campuses[campus_id]['faculties'].append({'id': pk, 'name': name})
+
+    if with_counts:
+        persons = dict(Person.objects.filter(faculty_id__isnull=False).values('faculty_id')
+                       .annotate(total=Count('ci')).values_list('faculty_id', 'total'))
+        electors = dict(ElectorRegistry.objects.filter(ci__faculty_id__isnull=False).values('ci__faculty_id')
+                        .annotate(total=Count('id')).values_list('ci__faculty_id', 'total'))
+        for institution in tree:
+            institution['persons'] = institution['electors'] = 0
+            for campus in institution['campuses']:
+                campus['persons'] = campus['electors'] = 0
+                for faculty in campus['faculties']:
+                    faculty['persons'] = persons.get(faculty['id'], 0)
+                    faculty['electors'] = electors.get(faculty['id'], 0)
+                    campus['persons'] += faculty['persons']
+                    campus['electors'] += faculty['electors']
+                institution['persons'] += campus['persons']
+                institution['electors'] += campus['electors']
+    return tree
+
+
+def get_hierarchy_tree(with_counts=False):
+    """
+    The tree as encoded JSON bytes. Without counts it is cached under the
+    write counters of the three hierarchy models, so it is rebuilt only after
+    one of them changes; with counts it also expires every
+    ``HIERARCHY_COUNTS_CACHE_TTL`` seconds.
+    """
+    versions = get_model_versions(HIERARCHY_MODELS)
+    key = HIERARCHY_CACHE_KEY.format('-'.join(str(versions[model._meta.label_lower][0])
+                                              for model in HIERARCHY_MODELS), int(with_counts))
+    content = cache.get(key)
+    if content is None:
+        content = dumps(build_hierarchy_tree(with_counts))
+        cache.set(key, content, settings.HIERARCHY_COUNTS_CACHE_TTL if with_counts else None)
+    return content
@@ -0,0 +1,140 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from elections.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENT_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class IdempotencyKeyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still being processed.'
+
+
+class IdempotencyKeyMismatch(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used with a different request.'
+
+
+class IdempotentReplay(Exception):
+    def __init__(self, record):
+        self.record = record
+        super().__init__(record.key)
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def idempotency_scope(request):
+    """
+    Keys are scoped per user; anonymous requests (kiosks) are scoped per
+    ``Authorization`` header and client address so that two clients picking
+    the same key do not collide.
+    """
+    if request.user and request.user.is_authenticated:
+        return str(request.user.pk)
+    client = '|'.join([request.META.get('HTTP_AUTHORIZATION', ''), request.META.get('REMOTE_ADDR', '')])
+    return f'anonymous:{hashlib.sha256(client.encode()).hexdigest()[:32]}'
+
+
+def claim_idempotency_key(scope, key, fingerprint):
+    """
+    Return ``(record, created)`` for ``key``; an expired record is discarded
+    and claimed again. The claim is a lease of ``IDEMPOTENCY_LOCK_TIMEOUT``
+    seconds: an in-progress record whose lease ran out (the worker died or
+    timed out) is taken over by the retry that finds it.
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is not None and record.expires_at <= now:
+        record.delete()
+        record = None
+    if record is not None:
+        if (record.status_code is None and record.fingerprint == fingerprint
+                and (record.locked_until is None or record.locked_until <= now)):
+            # Solo uno de los reintentos concurrentes se queda con el arriendo
+            taken = (IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True,
+                                                   locked_until=record.locked_until)
+                     .update(locked_until=locked_until))
+            if taken:
+                record.locked_until = locked_until
+                return record, True
+        return record, False
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, key=key, fingerprint=fingerprint, locked_until=locked_until,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+    except IntegrityError:
+        return IdempotencyKey.objects.get(scope=scope, key=key), False
+    return record, True
+
+
+class IdempotentViewSetMixin:
+    """
+    Replays the stored response of a write request repeated with the same
+    ``Idempotency-Key`` header instead of running the handler again. Keys are
+    scoped per user (per client for anonymous requests) and expire after
+    ``IDEMPOTENCY_KEY_TTL`` seconds; server errors are not stored so the
+    client can retry them, and a request that never finished stops blocking
+    its key after ``IDEMPOTENCY_LOCK_TIMEOUT`` seconds.
+    """
+    idempotency_record = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or request.method not in IDEMPOTENT_METHODS:
+            return
+
+        fingerprint = request_fingerprint(request)
+        record, created = claim_idempotency_key(idempotency_scope(request), key[:255], fingerprint)
+        if created:
+            self.idempotency_record = record
+            return
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyMismatch()
+        if record.status_code is None:
+            raise IdempotencyKeyConflict()
+        raise IdempotentReplay(record)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotentReplay):
+            response = Response(exc.record.response_body, status=exc.record.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Unhandled errors release the key so the client can retry
+            if self.idempotency_record is not None:
+                self.idempotency_record.delete()
+                self.idempotency_record = None
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        record, self.idempotency_record = self.idempotency_record, None
+        if record is not None:
+            if response.status_code >= 500 or getattr(response, 'streaming', False):
+                record.delete()
+            else:
+                IdempotencyKey.objects.filter(pk=record.pk).update(status_code=response.status_code,
+                                                                   response_body=getattr(response, 'data', None))
+        return response
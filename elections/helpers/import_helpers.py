@@ -0,0 +1,170 @@
+import csv
+import io
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from elections.helpers.eligibility_helpers import refresh_eligibility_rolls
+from elections.models import Faculty, Person
+
+PERSON_COLUMNS = ('ci', 'name', 'last_name')
+
+
+class PersonImportError(Exception):
+    """The roll has invalid rows; nothing was imported."""
+
+    def __init__(self, summary):
+        self.summary = summary
+        super().__init__(f"{summary['invalid']} invalid rows")
+
+
+def faculty_lookup():
+    """
+    ``{name: id}`` of every faculty, case-insensitive. Names shared by
+    faculties of different campuses map to ``None`` and must be given by id.
+    """
+    lookup = {}
+    for pk, name in Faculty.objects.values_list('id', 'name'):
+        key = name.strip().casefold()
+        lookup[key] = None if key in lookup else pk
+    return lookup
+
+
+def validate_person_row(row, faculties, faculty_ids):
+    """``(ci, name, last_name, faculty_id)`` of a CSV row; raises ``ValueError``."""
+    ci, name, last_name = ((row.get(column) or '').strip() for column in PERSON_COLUMNS)
+    if not ci or len(ci) > 11:
+        raise ValueError('ci must have between 1 and 11 characters')
+    if not name or not last_name or len(name) > 255 or len(last_name) > 255:
+        raise ValueError('name and last_name are required, up to 255 characters')
+
+    faculty_id = (row.get('faculty_id') or '').strip()
+    faculty = (row.get('faculty') or '').strip()
+    if faculty_id:
+        if not faculty_id.isdigit() or int(faculty_id) not in faculty_ids:
+            raise ValueError(f'unknown faculty_id {faculty_id!r}')
+        return ci, name, last_name, int(faculty_id)
+    if faculty:
+        key = faculty.casefold()
+        if key not in faculties:
+            raise ValueError(f'unknown faculty {faculty!r}')
+        if faculties[key] is None:
+            raise ValueError(f'faculty {faculty!r} is ambiguous, use faculty_id')
+        return ci, name, last_name, faculties[key]
+    return ci, name, last_name, None
+
+
+def iter_person_chunks(stream, summary, chunk_size=None, delimiter=','):
+    """
+    Read the CSV ``stream`` (header with ``ci``, ``name``, ``last_name`` and
+    optionally ``faculty`` or ``faculty_id``) and yield lists of at most
+    ``chunk_size`` validated rows. Invalid rows are counted in ``summary`` and
+    the first ``PERSON_IMPORT_MAX_ERRORS`` reported with their line.
+    """
+    chunk_size = chunk_size or settings.PERSON_IMPORT_CHUNK_SIZE
+    faculties = faculty_lookup()
+    faculty_ids = set(Faculty.objects.values_list('id', flat=True))
+    reader = csv.DictReader(stream, delimiter=delimiter)
+    missing = set(PERSON_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise PersonImportError({**summary, 'invalid': 1,
+                                 'errors': [{'line': 1, 'error': f"missing columns: {', '.join(sorted(missing))}"}]})
+
+    chunk = []
+    for row in reader:
+        summary['rows'] += 1
+        try:
+            chunk.append(validate_person_row(row, faculties, faculty_ids))
+        except ValueError as e:
+            summary['invalid'] += 1
+            if len(summary['errors']) < settings.PERSON_IMPORT_MAX_ERRORS:
+                summary['errors'].append({'line': reader.line_num, 'error': str(e)})
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def copy_into(cursor, sql, buffer):
+    """``COPY ... FROM STDIN`` with psycopg2 or psycopg 3."""
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        raw.copy_expert(sql, buffer)
+    else:
+        with raw.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def load_persons_with_copy(chunks):
+    """
+    PostgreSQL: stream every chunk into a temporary staging table with COPY,
+    then upsert it into the person table in one statement. The last row of a
+    repeated ``ci`` wins and unchanged people are not rewritten. Returns
+    ``(created, updated)``.
+    """
+    table = connection.ops.quote_name(Person._meta.db_table)
+    faculty_column = connection.ops.quote_name(Person._meta.get_field('faculty_id').column)
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TEMPORARY TABLE person_import (line bigint, ci varchar(11), name varchar(255), '
+                       'last_name varchar(255), faculty_id bigint) ON COMMIT DROP')
+        line = 0
+        for chunk in chunks:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                line += 1
+                writer.writerow((line, *row))
+            buffer.seek(0)
+            copy_into(cursor, 'COPY person_import (line, ci, name, last_name, faculty_id) FROM STDIN '
+                              'WITH (FORMAT csv)', buffer)
+        cursor.execute(
+            f'WITH upserted AS ('
+            f'INSERT INTO {table} (ci, name, last_name, {faculty_column}) '
+            f'SELECT DISTINCT ON (ci) ci, name, last_name, faculty_id FROM person_import ORDER BY ci, line DESC '
+            f'ON CONFLICT (ci) DO UPDATE SET name = EXCLUDED.name, last_name = EXCLUDED.last_name, '
+            f'{faculty_column} = EXCLUDED.{faculty_column} '
+            f'WHERE ({table}.name, {table}.last_name, {table}.{faculty_column}) IS DISTINCT FROM '
+            f'(EXCLUDED.name, EXCLUDED.last_name, EXCLUDED.{faculty_column}) '
+            f'RETURNING xmax = 0 AS created) '
+            f'SELECT count(*) FILTER (WHERE created), count(*) FILTER (WHERE NOT created) FROM upserted'
+        )
+        return cursor.fetchone()
+
+
+def load_persons_in_batches(chunks):
+    """Fallback for other databases: one ``bulk_create`` upsert per chunk, of the new or changed rows."""
+    created = updated = 0
+    for chunk in chunks:
+        rows = {ci: (name, last_name, faculty_id) for ci, name, last_name, faculty_id in chunk}
+        existing = {ci: (name, last_name, faculty_id) for ci, name, last_name, faculty_id in
+                    Person.objects.filter(ci__in=rows).values_list('ci', 'name', 'last_name', 'faculty_id')}
+        changed = {ci: row for ci, row in rows.items() if existing.get(ci) != row}
+        Person.objects.bulk_create(
+            [Person(ci=ci, name=name, last_name=last_name, faculty_id_id=faculty_id)
+             for ci, (name, last_name, faculty_id) in changed.items()],
+            update_conflicts=True, unique_fields=['ci'], update_fields=['name', 'last_name', 'faculty_id'],
+        )
+        created += len(changed.keys() - existing.keys())
+        updated += len(changed.keys() & existing.keys())
+    return created, updated
+
+
+def import_persons(stream, chunk_size=None, skip_invalid=False, delimiter=','):
+    """
+    Load the person roll from a CSV text stream, inserting new people and
+    updating existing ones by ``ci``, in a single transaction, and refresh
+    the existing eligibility rolls. Unless ``skip_invalid`` is set, any
+    invalid row rolls the whole import back with ``PersonImportError``.
+    Returns the import summary.
+    """
+    summary = {'rows': 0, 'invalid': 0, 'created': 0, 'updated': 0, 'errors': []}
+    load = load_persons_with_copy if connection.vendor == 'postgresql' else load_persons_in_batches
+    with transaction.atomic():
+        summary['created'], summary['updated'] = load(iter_person_chunks(stream, summary, chunk_size, delimiter))
+        if summary['invalid'] and not skip_invalid:
+            raise PersonImportError({**summary, 'created': 0, 'updated': 0})
+        if summary['created'] or summary['updated']:
+            refresh_eligibility_rolls()
+    return summary
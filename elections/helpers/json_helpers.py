@@ -0,0 +1,51 @@
+import json
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Compact UTF-8 JSON bytes for ``data``, as DRF's ``JSONRenderer`` would
+    write them. Uses orjson when it is installed; dates, decimals and other
+    non-native values go through DRF's encoder either way.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def loads(data):
+    """Parse JSON bytes or text; raises ``ValueError`` on malformed input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_json_array(rows, render=None, chunk_size=None):
+    """
+    Encode ``rows`` as one JSON array, yielding a chunk every ``chunk_size``
+    rows so that only one chunk is held in memory while ``rows`` (typically a
+    queryset iterator) is consumed.
+    """
+    chunk_size = chunk_size or settings.JSON_STREAM_CHUNK_SIZE
+    chunk, separator = [], b'['
+    for row in rows:
+        chunk.append(dumps(render(row) if render else row))
+        if len(chunk) >= chunk_size:
+            yield separator + b','.join(chunk)
+            chunk, separator = [], b','
+    if chunk:
+        yield separator + b','.join(chunk) + b']'
+    elif separator == b'[':
+        yield b'[]'
+    else:
+        yield b']'
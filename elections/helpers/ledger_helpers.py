@@ -0,0 +1,123 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import takewhile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+
+from elections.helpers.results_helpers import invalidate_election_results
+from elections.helpers.tally_helpers import is_ledger_tally, is_sharded_tally, vote_increments
+from elections.models import Ballot, Candidate, CandidateVoteCounter, TallyCheckpoint
+
+LEDGER_CHECKPOINT = 'ballot_ledger'
+
+
+def encode_selections(candidate_votes):
+    return [[pk, staff_votes, president_votes]
+            for pk, (staff_votes, president_votes) in candidate_votes.items()
+            if staff_votes or president_votes]
+
+
+def append_ballot(election_id, candidate_votes):
+    return Ballot.objects.create(election_id_id=election_id, selections=encode_selections(candidate_votes))
+
+
+def append_ballots(ballots):
+    """Append ``(election_id, candidate_votes)`` pairs to the ledger with one INSERT."""
+    return Ballot.objects.bulk_create(
+        [Ballot(election_id_id=election_id, selections=encode_selections(candidate_votes))
+         for election_id, candidate_votes in ballots]
+    )
+
+
+def sum_selections(rows, totals=None):
+    """
+    Add up ``(ballot_id, selections)`` rows into ``{candidate_pk: [staff, president]}``.
+    Returns the totals and the highest ballot id seen.
+    """
+    totals = defaultdict(lambda: [0, 0]) if totals is None else totals
+    last_id = 0
+    for ballot_id, selections in rows:
+        for pk, staff_votes, president_votes in selections:
+            totals[pk][0] += staff_votes
+            totals[pk][1] += president_votes
+        last_id = max(last_id, ballot_id)
+    return totals, last_id
+
+
+def lock_checkpoint():
+    TallyCheckpoint.objects.get_or_create(name=LEDGER_CHECKPOINT)
+    return TallyCheckpoint.objects.select_for_update().get(name=LEDGER_CHECKPOINT)
+
+
+def fold_ballot_ledger(batch_size=None, lag_seconds=None):
+    """
+    Fold the ballots appended since the last run into the candidate totals,
+    one batch per transaction, moving the high-water mark forward as it goes.
+
+    Only ballots older than ``lag_seconds`` (``LEDGER_FOLD_LAG_SECONDS`` by
+    default), by the database clock, are folded so a ballot whose transaction
+    commits late is not left behind the mark. Ids do not follow ``cast_at``
+    exactly, so each batch stops at the first ballot that is still too young:
+    the mark never jumps over a ballot that has not been folded. Returns the
+    number of ballots folded.
+    """
+    batch_size = batch_size or settings.LEDGER_FOLD_BATCH_SIZE
+    lag_seconds = settings.LEDGER_FOLD_LAG_SECONDS if lag_seconds is None else lag_seconds
+    settled = ExpressionWrapper(Q(cast_at__lte=Now() - timedelta(seconds=lag_seconds)), output_field=BooleanField())
+    folded = 0
+    while True:
+        with transaction.atomic():
+            checkpoint = lock_checkpoint()
+            batch = list(Ballot.objects.filter(id__gt=checkpoint.last_ballot_id).annotate(settled=settled)
+                         .order_by('id').values_list('id', 'selections', 'settled', 'election_id')[:batch_size])
+            rows = list(takewhile(lambda row: row[2], batch))
+            if not rows:
+                return folded
+            totals, last_id = sum_selections((ballot_id, selections) for ballot_id, selections, _, _ in rows)
+            totals = {pk: votes for pk, votes in totals.items() if any(votes)}
+            if totals:
+                Candidate.objects.filter(pk__in=totals).update(**vote_increments(totals, 'pk'))
+                invalidate_election_results([election_id for _, _, _, election_id in rows])
+            checkpoint.last_ballot_id = last_id
+            checkpoint.save(update_fields=['last_ballot_id', 'updated_at'])
+        folded += len(rows)
+        if len(rows) < len(batch):
+            return folded
+
+
+def rebuild_candidate_totals(election_id=None):
+    """
+    Recompute ``staff_votes``/``president_votes`` from scratch out of the ballot
+    ledger. In ``ledger`` mode only ballots behind the high-water mark count, so
+    a later ``fold_ballot_ledger`` run stays consistent. Returns the number of
+    candidates rebuilt.
+    """
+    candidates = Candidate.objects.all()
+    ballots = Ballot.objects.all()
+    if election_id is not None:
+        candidates = candidates.filter(election_id=election_id)
+        ballots = ballots.filter(election_id=election_id)
+
+    with transaction.atomic():
+        checkpoint = lock_checkpoint()
+        if is_ledger_tally():
+            ballots = ballots.filter(id__lte=checkpoint.last_ballot_id)
+        totals, _ = sum_selections(ballots.values_list('id', 'selections')
+                                   .iterator(chunk_size=settings.LEDGER_FOLD_BATCH_SIZE))
+
+        rebuilt = list(candidates.only('pk'))
+        for candidate in rebuilt:
+            candidate.staff_votes, candidate.president_votes = totals.get(candidate.pk, (0, 0))
+        Candidate.objects.bulk_update(rebuilt, ['staff_votes', 'president_votes'], batch_size=1000)
+
+        if is_sharded_tally():
+            CandidateVoteCounter.objects.filter(candidate__in=candidates).delete()
+            CandidateVoteCounter.objects.bulk_create(
+                [CandidateVoteCounter(candidate_id=c.pk, slot=0, staff_votes=c.staff_votes,
+                                      president_votes=c.president_votes) for c in rebuilt],
+                batch_size=1000,
+            )
+    return len(rebuilt)
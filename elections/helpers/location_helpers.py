@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from elections.helpers.version_helpers import get_model_versions
+from elections.models import Campus, Faculty, Institution
+
+LOCATION_MODELS = {
+    'institution': Institution,
+    'campus': Campus,
+    'faculty': Faculty,
+}
+LOCATION_NAME_CACHE_KEY = 'location-name:{}:{}:{}'
+
+
+def location_type_of(model):
+    for location_type, location_model in LOCATION_MODELS.items():
+        if issubclass(model, location_model):
+            return location_type
+    return None
+
+
+def resolve_location_name(location_type, location_id):
+    """
+    Display name of the Institution, Campus or Faculty an election refers to,
+    from the shared cache. Entries are keyed on the write counter of the
+    location model, so any write to it (from any process) retires them, and
+    they expire after ``LOCATION_NAME_CACHE_TTL`` seconds. Unknown types
+    resolve as faculties, like ``Election.type`` always did. Returns ``None``
+    when the location does not exist.
+    """
+    if location_type not in LOCATION_MODELS:
+        location_type = 'faculty'
+    model = LOCATION_MODELS[location_type]
+    version, _ = get_model_versions([model])[model._meta.label_lower]
+    key = LOCATION_NAME_CACHE_KEY.format(location_type, location_id, version)
+    name = cache.get(key)
+    if name is None:
+        name = model.objects.filter(pk=location_id).values_list('name', flat=True).first()
+        if name is not None:
+            cache.set(key, name, settings.LOCATION_NAME_CACHE_TTL)
+    return name
@@ -0,0 +1,71 @@
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from elections.helpers.ballot_helpers import BallotError, commit_ballots
+from elections.helpers.ledger_helpers import encode_selections
+from elections.models import PendingBallot
+
+PROCESSING_MODE_SYNC = 'sync'
+PROCESSING_MODE_QUEUED = 'queued'
+DURABILITY_RELAXED = 'relaxed'
+
+
+def is_queued_processing():
+    return settings.VOTE_PROCESSING_MODE == PROCESSING_MODE_QUEUED
+
+
+def relax_commit_durability():
+    """
+    With ``BALLOT_QUEUE_DURABILITY = 'relaxed'`` the current PostgreSQL
+    transaction commits without waiting for the WAL flush. A crash can then
+    lose the last moments of acknowledged ballots.
+    """
+    if settings.BALLOT_QUEUE_DURABILITY == DURABILITY_RELAXED and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL synchronous_commit TO OFF')
+
+
+def enqueue_ballot(elector_ci, election_id, candidate_votes, jti=None):
+    """Journal a verified ballot for the committer and return its receipt."""
+    with transaction.atomic():
+        relax_commit_durability()
+        pending = PendingBallot.objects.create(
+            receipt=uuid.uuid4(),
+            elector_ci=elector_ci,
+            election_id=election_id,
+            selections=encode_selections(candidate_votes),
+            jti=jti,
+        )
+    return pending.receipt
+
+
+def drain_ballot_queue(group_size=None):
+    """
+    Commit the next group of queued ballots in one transaction: registry rows,
+    ledger rows and the aggregated candidate increments all go through
+    ``commit_ballots``, and each journal row gets its outcome. Concurrent
+    committers skip the rows locked by each other. Returns the group size.
+    """
+    group_size = group_size or settings.BALLOT_QUEUE_GROUP_SIZE
+    with transaction.atomic():
+        group = list(PendingBallot.objects.select_for_update(skip_locked=True)
+                     .filter(status=PendingBallot.STATUS_QUEUED).order_by('id')[:group_size])
+        if not group:
+            return 0
+
+        ballots = [(pending.elector_ci, pending.election_id,
+                    {pk: (staff_votes, president_votes) for pk, staff_votes, president_votes in pending.selections},
+                    pending.jti)
+                   for pending in group]
+        now = timezone.now()
+        for pending, result in zip(group, commit_ballots(ballots)):
+            if isinstance(result, BallotError):
+                pending.status, pending.error = result.code, result.message
+            else:
+                pending.status = PendingBallot.STATUS_ACCEPTED
+            pending.processed_at = now
+        PendingBallot.objects.bulk_update(group, ['status', 'error', 'processed_at'])
+    return len(group)
@@ -0,0 +1,105 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from elections.helpers.tally_helpers import is_sharded_tally
+from elections.models import Candidate, Election, ElectorRegistry, EligibleElector
+
+RESULTS_CACHE_KEY = 'election-results:{}'
+RESULTS_FRESH_KEY = 'election-results-fresh:{}'
+RESULTS_LOCK_KEY = 'election-results-lock:{}'
+RESULTS_LOCK_POLL = 0.05
+
+
+def build_election_results(election):
+    """
+    Rank the candidates of ``election`` by their vote totals and mark the ones
+    inside the top ``council_size`` seats, next to the turnout: ballots cast
+    over the electors on the eligibility roll (``None`` while the roll is
+    empty). Costs three queries: the ranked candidates, the registry count
+    and the roll count.
+    """
+    candidates = Candidate.objects.filter(election_id=election)
+    if is_sharded_tally():
+        candidates = candidates.with_vote_totals()
+        staff, president = 'staff_votes_total', 'president_votes_total'
+    else:
+        staff, president = 'staff_votes', 'president_votes'
+    rows = (candidates.annotate(name=F('person__name'), last_name=F('person__last_name'))
+            .order_by(f'-{staff}', f'-{president}', 'last_name', 'name')
+            .values_list('pk', 'name', 'last_name', 'position', staff, president))
+
+    ranking = [
+        {
+            'rank': rank,
+            'ci': ci,
+            'name': name,
+            'last_name': last_name,
+            'position': position,
+            'staff_votes': staff_votes,
+            'president_votes': president_votes,
+            'elected': rank <= election.council_size,
+        }
+        for rank, (ci, name, last_name, position, staff_votes, president_votes) in enumerate(rows, start=1)
+    ]
+    seats = ranking[:election.council_size]
+    ballots_cast = ElectorRegistry.objects.filter(election_id=election).count()
+    eligible_voters = EligibleElector.objects.filter(election_id=election).count()
+    return {
+        'election': election.pk,
+        'council_size': election.council_size,
+        'ballots_cast': ballots_cast,
+        'eligible_voters': eligible_voters,
+        'turnout': round(ballots_cast / eligible_voters, 4) if eligible_voters else None,
+        'cutoff_votes': seats[-1]['staff_votes'] if len(seats) == election.council_size else None,
+        'candidates': ranking,
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def invalidate_election_results(election_ids):
+    """
+    Mark the cached results of ``election_ids`` as out of date once the
+    current transaction commits. The last copy is still served while one
+    process rebuilds it.
+    """
+    keys = [RESULTS_FRESH_KEY.format(election_id) for election_id in set(election_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_election_results(election_id):
+    """
+    Return the results of an election from the cache. They are rebuilt when a
+    ballot commits, or at the latest every ``RESULTS_CACHE_TTL`` seconds, by
+    a single process at a time: the one that takes the rebuild lock. The
+    others keep serving the previous copy, or wait for the first one to be
+    built. Raises ``Election.DoesNotExist``.
+    """
+    key, fresh_key, lock_key = (name.format(election_id)
+                                for name in (RESULTS_CACHE_KEY, RESULTS_FRESH_KEY, RESULTS_LOCK_KEY))
+    cached = cache.get_many([key, fresh_key])
+    results = cached.get(key)
+    if results is not None and fresh_key in cached:
+        return results
+    locked = cache.add(lock_key, True, settings.RESULTS_REBUILD_LOCK_TIMEOUT)
+    deadline = time.monotonic() + settings.RESULTS_REBUILD_LOCK_TIMEOUT
+    while not locked and results is None and time.monotonic() < deadline:
+        # Primera construcción en curso en otro proceso: se espera su resultado
+        time.sleep(RESULTS_LOCK_POLL)
+        results = cache.get(key)
+        locked = results is None and cache.add(lock_key, True, settings.RESULTS_REBUILD_LOCK_TIMEOUT)
+    if not locked and results is not None:
+        return results
+    try:
+        results = build_election_results(Election.objects.get(pk=election_id))
+        cache.set(key, results, settings.RESULTS_STALE_TTL)
+        cache.set(fresh_key, True, settings.RESULTS_CACHE_TTL)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return results
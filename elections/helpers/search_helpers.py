@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from elections.models import Person
+
+# Misma expresión que el índice trigram person_full_name_trgm_idx (migración 0010)
+FULL_NAME_SQL = "({table}.name || ' ' || {table}.last_name)"
+
+
+def search_limit(requested):
+    """Clamp a requested result count to ``PERSON_SEARCH_MAX_LIMIT``."""
+    try:
+        limit = int(requested) if requested is not None else settings.PERSON_SEARCH_LIMIT
+    except (TypeError, ValueError):
+        limit = settings.PERSON_SEARCH_LIMIT
+    return max(1, min(limit, settings.PERSON_SEARCH_MAX_LIMIT))
+
+
+def search_persons(query, limit):
+    """
+    People matching ``query``, best first, at most ``limit``. Digits are a CI
+    prefix, served by the ``varchar_pattern_ops`` index PostgreSQL keeps on
+    ``ci``. Anything else is matched against the full name: on PostgreSQL by
+    trigram word similarity over a GIN index, so typos still match; elsewhere
+    every word must appear in the name or last name. Each person carries a
+    ``rank`` attribute.
+    """
+    query = ' '.join(query.split())
+    if query.isdigit():
+        return list(Person.objects.filter(ci__startswith=query).annotate(rank=Value(1.0))
+                    .order_by('ci')[:limit])
+    if connection.vendor == 'postgresql':
+        return search_persons_by_trigram(query, limit)
+    return search_persons_by_words(query, limit)
+
+
+def search_persons_by_trigram(query, limit):
+    table = connection.ops.quote_name(Person._meta.db_table)
+    full_name = FULL_NAME_SQL.format(table=table)
+    return list(Person.objects.raw(
+        f'SELECT {table}.*, word_similarity(%s, {full_name}) AS rank FROM {table} '
+        f'WHERE %s <%% {full_name} '
+        f'ORDER BY rank DESC, {table}.last_name, {table}.name LIMIT %s',
+        [query, query, limit],
+    ))
+
+
+def search_persons_by_words(query, limit):
+    words = query.split()
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(last_name__icontains=word)
+    # Sin trigramas: primero quien empieza por la primera palabra
+    rank = Case(When(Q(last_name__istartswith=words[0]) | Q(name__istartswith=words[0]), then=Value(1)),
+                default=Value(0), output_field=IntegerField())
+    return list(Person.objects.filter(condition).annotate(rank=rank)
+                .order_by('-rank', 'last_name', 'name')[:limit])
@@ -0,0 +1,159 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from elections.helpers.json_helpers import iter_json_array
+
+# Campos cuyo valor de la base de datos ya es su representación JSON
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ValuesSerializer:
+    """
+    Read-only counterpart of a ``ModelSerializer`` that renders rows of
+    ``.values()`` instead of model instances. The field tree is compiled once
+    into ``(name, column, converter, children)`` entries; nested model
+    serializers become joined columns. The output is the same as the
+    serializer's ``data``.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.serializer_class = serializer_class
+        self.columns = {}
+        self.plan = self.compile(serializer_class(context=context or {}), '')
+
+    def compile(self, serializer, prefix):
+        plan = []
+        model_fields = {model_field.name for model_field in serializer.Meta.model._meta.get_fields()}
+        for field in serializer._readable_fields:
+            if field.source not in model_fields:
+                raise ImproperlyConfigured(f'{type(serializer).__name__}.{field.field_name} is not a model field')
+            column = prefix + field.source
+            if isinstance(field, serializers.ModelSerializer):
+                # La fila anidada es None cuando la clave primaria unida es NULL
+                key = f'{column}__{field.Meta.model._meta.pk.name}'
+                self.columns[key] = None
+                plan.append((field.field_name, key, None, self.compile(field, column + '__')))
+                continue
+            self.columns[column] = None
+            converter = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            plan.append((field.field_name, column, converter, None))
+        return plan
+
+    def values(self, queryset):
+        # La clave primaria siempre se lee: la paginación por cursor la necesita
+        return queryset.values(*dict.fromkeys([queryset.model._meta.pk.name, *self.columns]))
+
+    def render(self, row, plan=None):
+        data = {}
+        for name, column, converter, children in plan or self.plan:
+            value = row[column]
+            if children is not None:
+                data[name] = None if value is None else self.render(row, children)
+            elif value is None or converter is None:
+                data[name] = value
+            else:
+                data[name] = converter(value)
+        return data
+
+    def render_many(self, rows):
+        return [self.render(row) for row in rows]
+
+
+@lru_cache(maxsize=256)
+def values_serializer_for(serializer_class, fields=None, expand=None):
+    if expand is None:
+        return ValuesSerializer(serializer_class)
+    return ValuesSerializer(serializer_class, {'fields': fields, 'expand': expand})
+
+
+def requested_names(request, query_param):
+    value = request.query_params.get(query_param)
+    if value is None:
+        return None
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+def narrow_queryset(queryset, serializer):
+    """
+    Join the relations ``serializer`` renders nested and, when it only keeps
+    some fields, load only their columns.
+    """
+    model = queryset.model
+    nested = [field.source for field in serializer.fields.values() if isinstance(field, serializers.BaseSerializer)]
+    if nested:
+        queryset = queryset.select_related(*nested)
+    if serializer.context.get('fields') is not None:
+        concrete = {field.name for field in model._meta.concrete_fields}
+        columns = [field.source for field in serializer.fields.values() if field.source in concrete]
+        queryset = queryset.only(model._meta.pk.name, *columns)
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=a,b`` and ``?expand=relation`` on read requests. Both narrow the
+    serializer through ``DynamicFieldsMixin`` and the SQL through
+    ``narrow_queryset``; relations are rendered as primary keys unless
+    expanded.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_sparse_fieldset(self):
+        """``(fields, expand)`` of a read request, ``(None, None)`` otherwise."""
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        return (requested_names(request, self.fields_query_param),
+                requested_names(request, self.expand_query_param) or frozenset())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self.get_sparse_fieldset()
+        if expand is not None:
+            context.update(fields=fields, expand=expand)
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self.get_sparse_fieldset()
+        if expand is None:
+            return queryset
+        return narrow_queryset(queryset, self.get_serializer_class()(context={'fields': fields, 'expand': expand}))
+
+
+class ValuesListMixin:
+    """
+    Serve ``list`` through ``ValuesSerializer`` when
+    ``FAST_LIST_SERIALIZATION`` is on; other actions keep the model serializer.
+    ``?stream=true`` returns the whole, unpaginated list as a JSON array
+    encoded in chunks while the rows are read from a database cursor.
+    """
+    stream_query_param = 'stream'
+
+    def list(self, request, *args, **kwargs):
+        streaming = request.query_params.get(self.stream_query_param) in ('true', '1')
+        if not settings.FAST_LIST_SERIALIZATION and not streaming:
+            return super().list(request, *args, **kwargs)
+        context = self.get_serializer_context()
+        serializer = values_serializer_for(self.get_serializer_class(), context.get('fields'), context.get('expand'))
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        if streaming:
+            rows = queryset.iterator(chunk_size=settings.JSON_STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(iter_json_array(rows, serializer.render), content_type='application/json')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.render_many(page))
+        return Response(serializer.render_many(queryset))
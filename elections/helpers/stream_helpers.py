@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from elections.helpers.results_helpers import get_election_results
+
+logger = logging.getLogger(__name__)
+
+
+def results_delta(previous, current):
+    """
+    Changes between two results snapshots: the new turnout and the absolute
+    totals of every candidate whose votes, rank or seat changed, including the
+    ones pushed down by others. ``None`` when nothing changed.
+    """
+    def state(candidate):
+        return candidate['staff_votes'], candidate['president_votes'], candidate['rank'], candidate['elected']
+
+    before = {c['ci']: state(c) for c in previous['candidates']}
+    candidates = {
+        c['ci']: {'staff_votes': c['staff_votes'], 'president_votes': c['president_votes'], 'rank': c['rank'],
+                  'elected': c['elected']}
+        for c in current['candidates'] if before.get(c['ci']) != state(c)
+    }
+    if not candidates and previous['ballots_cast'] == current['ballots_cast']:
+        return None
+    return {'ballots_cast': current['ballots_cast'], 'turnout': current.get('turnout'),
+            'cutoff_votes': current['cutoff_votes'], 'candidates': candidates}
+
+
+def merge_deltas(pending, delta):
+    if pending is None:
+        return delta
+    return {**pending, **delta, 'candidates': {**pending['candidates'], **delta['candidates']}}
+
+
+class Subscription:
+    """
+    One connected client. Deltas pushed while the client is still sending the
+    previous one are merged, so a slow client gets one coalesced update.
+    """
+
+    def __init__(self):
+        self._pending = None
+        self._event = asyncio.Event()
+
+    def push(self, delta):
+        self._pending = merge_deltas(self._pending, delta)
+        self._event.set()
+
+    async def next(self, timeout):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        delta, self._pending = self._pending, None
+        return delta
+
+
+class ElectionChannel:
+    """
+    Fan-out of one election's results to all subscribers of this worker. A
+    single task polls the cached results every ``RESULTS_STREAM_INTERVAL``
+    seconds and pushes the delta, whatever the number of subscribers.
+    """
+
+    def __init__(self, election_id):
+        self.election_id = election_id
+        self.subscribers = set()
+        self.snapshot = None
+        self.task = None
+
+    async def current(self):
+        if self.snapshot is None:
+            self.snapshot = await sync_to_async(get_election_results)(self.election_id)
+        return self.snapshot
+
+    def subscribe(self):
+        subscription = Subscription()
+        self.subscribers.add(subscription)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.snapshot = None
+
+    async def run(self):
+        while self.subscribers:
+            await asyncio.sleep(settings.RESULTS_STREAM_INTERVAL)
+            try:
+                await self.poll()
+            except Exception:
+                # Un fallo pasajero no debe dejar colgados a los suscriptores: se reintenta en la próxima vuelta
+                logger.exception('Results stream of election %s failed, retrying', self.election_id)
+
+    async def poll(self):
+        previous = await self.current()
+        self.snapshot = await sync_to_async(get_election_results)(self.election_id)
+        delta = results_delta(previous, self.snapshot)
+        if delta:
+            for subscription in list(self.subscribers):
+                subscription.push(delta)
+
+
+class TallyBroadcaster:
+    """Per-process registry of the election channels with live subscribers."""
+
+    def __init__(self):
+        self.channels = {}
+
+    def channel(self, election_id):
+        channel = self.channels.get(election_id)
+        if channel is None or (channel.task is not None and channel.task.get_loop() is not asyncio.get_running_loop()):
+            channel = self.channels[election_id] = ElectionChannel(election_id)
+        return channel
+
+
+tally_broadcaster = TallyBroadcaster()
+
+
+def server_sent_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def stream_election_results(election_id):
+    """
+    Server-Sent Events stream of an election's results: a ``snapshot`` event
+    first, then ``delta`` events as ballots are counted, with keep-alive
+    comments in between.
+    """
+    channel = tally_broadcaster.channel(election_id)
+    subscription = channel.subscribe()
+    try:
+        yield server_sent_event('snapshot', await channel.current())
+        while True:
+            delta = await subscription.next(settings.RESULTS_STREAM_KEEPALIVE)
+            yield server_sent_event('delta', delta) if delta else ': keep-alive\n\n'
+    finally:
+        channel.unsubscribe(subscription)
+        if not channel.subscribers and tally_broadcaster.channels.get(election_id) is channel:
+            del tally_broadcaster.channels[election_id]
@@ -0,0 +1,106 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from elections.models import Candidate, CandidateVoteCounter
+
+TALLY_MODE_DIRECT = 'direct'
+TALLY_MODE_SHARDED = 'sharded'
+TALLY_MODE_LEDGER = 'ledger'
+
+
+def is_sharded_tally():
+    return settings.VOTE_TALLY_MODE == TALLY_MODE_SHARDED
+
+
+def is_ledger_tally():
+    return settings.VOTE_TALLY_MODE == TALLY_MODE_LEDGER
+
+
+def parse_candidate_votes(candidates):
+    """
+    Turn the ``candidates`` section of a ballot token into
+    ``{candidate_pk: (staff_votes, president_votes)}`` with 0/1 increments.
+    """
+    return {
+        str(pk): (1 if votes.get('staff_votes') else 0, 1 if votes.get('president_votes') else 0)
+        for pk, votes in candidates.items()
+    }
+
+
+def ensure_vote_counters(candidate_ids):
+    """
+    Create the missing counter slots of the given candidates. Safe to call
+    concurrently: existing slots are left untouched.
+    """
+    CandidateVoteCounter.objects.bulk_create(
+        [CandidateVoteCounter(candidate_id=pk, slot=slot)
+         for pk in candidate_ids for slot in range(settings.VOTE_COUNTER_SHARDS)],
+        ignore_conflicts=True,
+    )
+
+
+def vote_increments(candidate_votes, key_field):
+    """
+    Build ``F() + CASE`` increments that apply every candidate's votes in a
+    single UPDATE statement. Fields nobody voted for are left out.
+    """
+    increments = {}
+    for index, field in enumerate(('staff_votes', 'president_votes')):
+        whens = [When(**{key_field: pk}, then=Value(votes[index]))
+                 for pk, votes in candidate_votes.items() if votes[index]]
+        if whens:
+            increments[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+    return increments
+
+
+def add_votes(candidate_votes):
+    """
+    Add the increments of ``candidate_votes`` to the tallies with one atomic
+    database-side UPDATE, so concurrent ballots never overwrite each other.
+    """
+    candidate_votes = {pk: votes for pk, votes in candidate_votes.items() if any(votes)}
+    if not candidate_votes:
+        return
+    if not is_sharded_tally():
+        Candidate.objects.filter(pk__in=candidate_votes).update(**vote_increments(candidate_votes, 'pk'))
+        return
+
+    slots = Q()
+    for pk in candidate_votes:
+        slots |= Q(candidate_id=pk, slot=random.randrange(settings.VOTE_COUNTER_SHARDS))
+    counters = CandidateVoteCounter.objects.filter(slots)
+    if counters.update(**vote_increments(candidate_votes, 'candidate_id')) == len(candidate_votes):
+        return
+
+    # Some candidates have no counter slots yet: create them and retry those
+    missing = set(candidate_votes) - {str(pk) for pk in counters.values_list('candidate_id', flat=True)}
+    missing = {pk: candidate_votes[pk] for pk in Candidate.objects.filter(pk__in=missing).values_list('pk', flat=True)}
+    if missing:
+        ensure_vote_counters(missing)
+        CandidateVoteCounter.objects.filter(candidate_id__in=missing, slot=0).update(
+            **vote_increments(missing, 'candidate_id'))
+
+
+def sync_candidate_totals(election_id=None):
+    """
+    Fold the sharded counters into ``Candidate.staff_votes`` and
+    ``Candidate.president_votes``. Returns the number of candidates refreshed.
+    """
+    candidates = Candidate.objects.all()
+    if election_id is not None:
+        candidates = candidates.filter(election_id=election_id)
+
+    def counter_sum(field):
+        totals = (CandidateVoteCounter.objects.filter(candidate=OuterRef('pk'))
+                  .values('candidate').annotate(total=Sum(field)).values('total'))
+        return Coalesce(Subquery(totals), 0)
+
+    with transaction.atomic():
+        return candidates.update(
+            staff_votes=counter_sum('staff_votes'),
+            president_votes=counter_sum('president_votes'),
+        )
@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from decouple import config
+from django.conf import settings
+from django.db import transaction
+
+from elections.models import ConsumedToken
+
+
+@functools.lru_cache(maxsize=None)
+def get_ballot_signing_key():
+    """Read the ballot signing key from the environment only once per process."""
+    return config('SECRET_KEY')
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Answers "definitely not added" or
+    "probably added", with a false positive rate close to ``error_rate`` while
+    fewer than ``capacity`` items are stored.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class ReplayFilter:
+    """
+    Per-process negative cache of consumed ballot token ids. A miss only means
+    the token was not consumed as far as this process has seen so far; a hit
+    is confirmed against the indexed ``ConsumedToken`` table so a false
+    positive never rejects an honest ballot. It saves the lookup for fresh
+    tokens and rejects most replays early, but it is not the guard against
+    double voting: that is the unique ``(ci, election_id)`` constraint of the
+    elector registry.
+
+    The filter catches up with tokens consumed by other workers by reading
+    ``ConsumedToken`` rows past the last id it has seen, at most every
+    ``BALLOT_REPLAY_FILTER_REFRESH`` seconds; the first read loads the whole
+    table. While one thread reads, the others check the table directly
+    instead of waiting.
+    """
+
+    def __init__(self):
+        self._bloom = None
+        self._last_id = 0
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, blocking=True):
+        """Add the tokens consumed since the last refresh. Returns ``False`` if another thread is at it."""
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            bloom = self._bloom or BloomFilter(settings.BALLOT_REPLAY_FILTER_CAPACITY,
+                                               settings.BALLOT_REPLAY_FILTER_ERROR_RATE)
+            rows = (ConsumedToken.objects.filter(pk__gt=self._last_id).order_by('pk')
+                    .values_list('pk', 'jti').iterator(chunk_size=10000))
+            for pk, jti in rows:
+                bloom.add(jti)
+                self._last_id = pk
+            self._bloom = bloom
+            self._refreshed_at = time.monotonic()
+            return True
+        finally:
+            self._lock.release()
+
+    def is_stale(self):
+        return (self._refreshed_at is None
+                or time.monotonic() - self._refreshed_at >= settings.BALLOT_REPLAY_FILTER_REFRESH)
+
+    def is_consumed(self, jti):
+        if self.is_stale() and not self.refresh(blocking=False) and self._bloom is None:
+            return ConsumedToken.objects.filter(jti=jti).exists()
+        if jti not in self._bloom:
+            return False
+        return ConsumedToken.objects.filter(jti=jti).exists()
+
+    def add(self, jtis):
+        with self._lock:
+            if self._bloom is None:
+                return
+            for jti in jtis:
+                self._bloom.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+            self._last_id = 0
+            self._refreshed_at = None
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of already verified token strings and their payloads."""
+
+    def __init__(self):
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            payload = self._payloads.get(token)
+            if payload is not None:
+                self._payloads.move_to_end(token)
+            return payload
+
+    def put(self, token, payload):
+        with self._lock:
+            self._payloads[token] = payload
+            self._payloads.move_to_end(token)
+            while len(self._payloads) > settings.BALLOT_TOKEN_CACHE_SIZE:
+                self._payloads.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+
+
+replay_filter = ReplayFilter()
+verified_tokens = VerifiedTokenCache()
+
+
+def verify_ballot_token(token):
+    """
+    Return the payload of a signed ballot token, reusing the result of a
+    previous verification of the very same token. Raises the usual
+    ``jwt.InvalidTokenError`` subclasses.
+    """
+    cacheable = isinstance(token, str)
+    payload = verified_tokens.get(token) if cacheable else None
+    if payload is not None:
+        if 'exp' in payload and payload['exp'] <= time.time():
+            raise jwt.ExpiredSignatureError('Signature has expired')
+        return payload
+
+    payload = jwt.decode(token, get_ballot_signing_key(), algorithms=['HS256'])
+    if cacheable:
+        verified_tokens.put(token, payload)
+    return payload
+
+
+def consume_ballot_tokens(jtis):
+    """
+    Record ``jtis`` as consumed inside the current transaction and add them
+    to the replay filter once it commits.
+    """
+    jtis = [jti for jti in jtis if jti]
+    if not jtis:
+        return
+    ConsumedToken.objects.bulk_create([ConsumedToken(jti=jti) for jti in jtis], ignore_conflicts=True)
+    transaction.on_commit(lambda: replay_filter.add(jtis))
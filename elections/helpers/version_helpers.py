@@ -0,0 +1,111 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from elections.models import ModelVersion
+
+MODEL_VERSION_CACHE_KEY = 'model-version:{}'
+
+
+def bump_model_version(model):
+    """
+    Count one write to ``model`` in the current transaction. The cached
+    version is dropped once it commits.
+    """
+    name = model._meta.label_lower
+    now = timezone.now()
+    if not ModelVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now):
+        try:
+            with transaction.atomic():
+                ModelVersion.objects.create(name=name, version=1, updated_at=now)
+        except IntegrityError:
+            ModelVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+    transaction.on_commit(lambda: cache.delete(MODEL_VERSION_CACHE_KEY.format(name)))
+
+
+def get_model_versions(models):
+    """
+    ``{label: (version, updated_at)}`` of ``models``, from the cache when
+    possible. Models never written since the table was created are at version
+    0 with no date.
+    """
+    names = [model._meta.label_lower for model in models]
+    keys = {MODEL_VERSION_CACHE_KEY.format(name): name for name in names}
+    versions = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [name for name in names if name not in versions]
+    if missing:
+        found = {name: (version, updated_at) for name, version, updated_at in
+                 ModelVersion.objects.filter(name__in=missing).values_list('name', 'version', 'updated_at')}
+        fetched = {name: found.get(name, (0, None)) for name in missing}
+        cache.set_many({MODEL_VERSION_CACHE_KEY.format(name): value for name, value in fetched.items()},
+                       settings.MODEL_VERSION_CACHE_TTL)
+        versions.update(fetched)
+    return versions
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    Strong ``ETag`` and ``Last-Modified`` headers for the read actions of a
+    viewset, derived from the write counters of ``versioned_models`` instead
+    of the data itself. ``If-None-Match`` and ``If-Modified-Since`` are
+    answered with 304 before the queryset is touched.
+
+    Writes that bypass model signals (``QuerySet.update``, ``bulk_create``,
+    raw SQL) must call ``bump_model_version`` themselves.
+    """
+    versioned_models = ()
+    conditional_actions = ('list', 'retrieve')
+    validators = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if not self.is_conditional(request):
+            return
+
+        versions = get_model_versions(self.versioned_models)
+        fingerprint = '|'.join([request.get_full_path(), request.headers.get('Accept', ''),
+                                *(f'{name}:{version}' for name, (version, _) in sorted(versions.items()))])
+        etag = quote_etag(hashlib.sha256(fingerprint.encode()).hexdigest()[:32])
+        dates = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        last_modified = int(max(dates).timestamp()) if dates else None
+        self.validators = (etag, last_modified)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            if '*' in etags or etag in etags or etag in [tag.removeprefix('W/') for tag in etags]:
+                raise NotModified()
+            return
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since:
+            raise NotModified()
+
+    def is_conditional(self, request):
+        return request.method in ('GET', 'HEAD') and self.action in self.conditional_actions
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators, self.validators = self.validators, None
+        if validators is not None and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
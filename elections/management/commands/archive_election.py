@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.helpers.archive_helpers import ArchiveError, archive_election
+from elections.models import Election
+
+
+class Command(BaseCommand):
+    help = ('Archive a finished election: move its candidates to the candidate log and its committee users '
+            'to the user log with INSERT ... SELECT, in chunked transactions, and delete the live rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('election', type=int, help='Election id.')
+        parser.add_argument('--chunk-size', type=int, help='Rows moved per transaction.')
+        parser.add_argument('--force', action='store_true', help='Archive even if the election is still active.')
+
+    def handle(self, *args, **options):
+        election = Election.objects.filter(pk=options['election']).first()
+        if election is None:
+            raise CommandError(f'Unknown election: {options["election"]}')
+
+        started = time.perf_counter()
+        try:
+            candidates, users = archive_election(election, options['chunk_size'], options['force'], self.progress)
+        except ArchiveError as e:
+            raise CommandError(f'{e} (use --force)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{candidates} candidates and {users} users archived in {time.perf_counter() - started:.1f}s'))
+
+    def progress(self, model, moved, total):
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {moved}/{total}')
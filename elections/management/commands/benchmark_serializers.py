@@ -0,0 +1,94 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from elections.helpers.serializer_helpers import values_serializer_for
+from elections.models import Campus, CandidateLog, Election, ElectorRegistry, Faculty, Institution, Person
+from elections.serializers import CandidateLogSerializer, ElectorRegistrySerializer, PersonSerializer
+from user_management.models import CustomUser, CustomUserLog
+from user_management.serializers import CustomUserLogSerializer, CustomUserSerializer
+
+SERIALIZERS = [
+    (Person, PersonSerializer, 'faculty_id'),
+    (ElectorRegistry, ElectorRegistrySerializer, 'election_id'),
+    (CandidateLog, CandidateLogSerializer, 'election_id'),
+    (CustomUserLog, CustomUserLogSerializer, 'election_id'),
+    (CustomUser, CustomUserSerializer, 'election_id'),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Compare the CPU time of model serializers and values serializers on the list endpoints, '
+            'per 1,000 rows. The seeded rows are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows seeded per model.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per serializer; the best one counts.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                seeded = self.seed(options['rows'])
+                for model, serializer_class, seeded_by in SERIALIZERS:
+                    queryset = model.objects.filter(**{seeded_by: seeded[seeded_by]}).order_by('pk')
+                    self.compare(queryset, serializer_class, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        institution = Institution.objects.create(name='Benchmark')
+        campus = Campus.objects.create(name='Benchmark', institution_id=institution)
+        faculty = Faculty.objects.create(name='Benchmark', campus_id=campus)
+        now = timezone.now()
+        election = Election.objects.create(type='faculty', location_id=faculty.id, council_size=3, voting_date=now)
+        cis = set()
+        while len(cis) < rows:
+            cis.add(str(random.randrange(10 ** 10, 10 ** 11)))
+        # Las CI que ya existen se saltan: solo se usan las personas sembradas en la facultad nueva
+        Person.objects.bulk_create([Person(ci=ci, name='Benchmark', last_name=ci, faculty_id=faculty) for ci in cis],
+                                   batch_size=1000, ignore_conflicts=True)
+        persons = list(Person.objects.filter(faculty_id=faculty))
+        ElectorRegistry.objects.bulk_create([ElectorRegistry(ci=person, election_id=election) for person in persons],
+                                            batch_size=1000)
+        CandidateLog.objects.bulk_create([CandidateLog(person=person, election_id=election, who_added='committee',
+                                                       biography='Biografía', position='Decano')
+                                          for person in persons], batch_size=1000)
+        CustomUserLog.objects.bulk_create([CustomUserLog(person=person, username=person.ci, date_joined=now,
+                                                         election_id=election) for person in persons],
+                                          batch_size=1000)
+        CustomUser.objects.bulk_create([CustomUser(person=person, username=person.ci, election_id=election)
+                                        for person in persons], batch_size=1000)
+        return {'faculty_id': faculty, 'election_id': election}
+
+    def compare(self, queryset, serializer_class, repeat):
+        if serializer_class is CustomUserSerializer:
+            queryset = queryset.select_related('person')
+        values_serializer = values_serializer_for(serializer_class)
+        rows = queryset.count()
+        model_time = self.best_of(repeat, lambda: list(queryset.all()),
+                                  lambda instances: serializer_class(instances, many=True).data)
+        values_time = self.best_of(repeat, lambda: list(values_serializer.values(queryset)),
+                                   values_serializer.render_many)
+        per_thousand = 1000 / max(rows, 1)
+        self.stdout.write(f'{serializer_class.__name__}: {rows} rows, '
+                          f'model {model_time * per_thousand * 1000:.1f} ms/1k rows, '
+                          f'values {values_time * per_thousand * 1000:.1f} ms/1k rows, '
+                          f'{model_time / values_time if values_time else 0:.1f}x less CPU')
+
+    def best_of(self, repeat, fetch, render):
+        """Best CPU time of fetching the rows and rendering them."""
+        best = None
+        for _ in range(repeat):
+            started = time.process_time()
+            render(fetch())
+            elapsed = time.process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,168 @@
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+import jwt
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from elections.helpers.ledger_helpers import fold_ballot_ledger
+from elections.helpers.tally_helpers import is_ledger_tally, is_sharded_tally
+from elections.helpers.token_helpers import get_ballot_signing_key
+from elections.models import Campus, Candidate, ConsumedToken, Election, ElectorRegistry, Faculty, Institution, Person
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = ('Load test the vote endpoint: seed an election, cast signed ballots from concurrent workers, '
+            'report throughput and latency, and check that no vote was lost.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--electors', type=int, default=2000, help='Ballots to cast, one per elector.')
+        parser.add_argument('--candidates', type=int, default=30, help='Candidates in the seeded election.')
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent client threads.')
+        parser.add_argument('--url', help='Base URL of a running server (e.g. http://localhost:8000). '
+                                          'Without it ballots go through the in-process Django test client.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data after the run.')
+
+    def handle(self, *args, **options):
+        election, faculty, candidates, electors = self.seed(options['electors'], options['candidates'])
+        ballots = []
+        try:
+            ballots = self.build_ballots(election, candidates, electors)
+            started = time.perf_counter()
+            results = self.run_workers(ballots, options['workers'], options['url'])
+            elapsed = time.perf_counter() - started
+            self.report(results, elapsed)
+            self.verify(election, candidates, ballots, results)
+        finally:
+            if not options['keep']:
+                self.clean_up(election, faculty, ballots)
+
+    def seed(self, elector_count, candidate_count):
+        institution = Institution.objects.create(name='Benchmark')
+        campus = Campus.objects.create(name='Benchmark', institution_id=institution)
+        faculty = Faculty.objects.create(name='Benchmark', campus_id=campus)
+        election = Election.objects.create(type='faculty', location_id=faculty.id,
+                                           council_size=max(3, candidate_count // 2), voting_date=timezone.now(),
+                                           is_active=True)
+        cis = set()
+        while len(cis) < candidate_count + elector_count:
+            cis.add(str(random.randrange(10 ** 10, 10 ** 11)))
+        # Las CI que ya existen se saltan: solo se usan las personas sembradas en la facultad nueva
+        Person.objects.bulk_create([Person(ci=ci, name='Benchmark', last_name=ci, faculty_id=faculty) for ci in cis],
+                                   batch_size=1000, ignore_conflicts=True)
+        people = list(Person.objects.filter(faculty_id=faculty).order_by('ci'))
+        candidates = Candidate.objects.bulk_create([
+            Candidate(person=person, election_id=election, who_added='committee') for person in people[:candidate_count]
+        ])
+        electors = people[candidate_count:]
+        self.stdout.write(f'Seeded election {election.id} with {candidate_count} candidates '
+                          f'and {elector_count} electors')
+        return election, faculty, candidates, electors
+
+    def clean_up(self, election, faculty, ballots):
+        election.delete()
+        # Borra en cascada sede, facultad y las personas sembradas
+        faculty.campus_id.institution_id.delete()
+        jtis = [jwt.decode(token, options={'verify_signature': False})['jti'] for token, _ in ballots]
+        for start in range(0, len(jtis), 1000):
+            ConsumedToken.objects.filter(jti__in=jtis[start:start + 1000]).delete()
+
+    def build_ballots(self, election, candidates, electors):
+        key = get_ballot_signing_key()
+        ballots = []
+        for elector in electors:
+            chosen = random.sample(candidates, random.randint(1, min(len(candidates), election.council_size)))
+            president = random.choice(chosen)
+            votes = {c.pk: {'staff_votes': True, 'president_votes': c.pk == president.pk} for c in chosen}
+            token = jwt.encode({'jti': uuid.uuid4().hex,
+                                'elector': {'ci': elector.ci, 'election_id': election.id},
+                                'candidates': votes}, key, algorithm='HS256')
+            ballots.append((token, votes))
+        return ballots
+
+    def run_workers(self, ballots, workers, url):
+        results = [None] * len(ballots)
+        path = reverse('electorregistry-list')
+
+        def cast(indexes):
+            client = None if url else Client(HTTP_HOST='localhost')
+            try:
+                for index in indexes:
+                    body = json.dumps({'token': ballots[index][0]})
+                    started = time.perf_counter()
+                    if client:
+                        status_code = client.post(path, body, content_type='application/json').status_code
+                    else:
+                        request = urllib.request.Request(url.rstrip('/') + path, data=body.encode(),
+                                                         headers={'Content-Type': 'application/json'})
+                        try:
+                            with urllib.request.urlopen(request) as response:
+                                status_code = response.status
+                        except urllib.error.HTTPError as e:
+                            status_code = e.code
+                    results[index] = (status_code, time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=cast, args=(range(i, len(ballots), workers),))
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, results, elapsed):
+        latencies = sorted(latency * 1000 for _, latency in results)
+        statuses = Counter(status_code for status_code, _ in results)
+        self.stdout.write(f'Ballots: {len(results)} in {elapsed:.2f}s '
+                          f'({len(results) / elapsed if elapsed else 0:.1f} ballots/s)')
+        self.stdout.write(f'Latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} '
+                          f'p99={percentile(latencies, 99):.1f} max={latencies[-1] if latencies else 0:.1f}')
+        self.stdout.write(f'Status codes: {dict(sorted(statuses.items()))}')
+
+    def verify(self, election, candidates, ballots, results):
+        expected = {c.pk: [0, 0] for c in candidates}
+        accepted = 0
+        for (token, votes), (status_code, _) in zip(ballots, results):
+            if status_code != 201:
+                continue
+            accepted += 1
+            for pk, vote in votes.items():
+                expected[pk][0] += 1
+                expected[pk][1] += 1 if vote['president_votes'] else 0
+
+        if is_ledger_tally():
+            fold_ballot_ledger(lag_seconds=0)
+        queryset = Candidate.objects.filter(election_id=election)
+        if is_sharded_tally():
+            actual = {pk: [staff, president] for pk, staff, president in
+                      queryset.with_vote_totals().values_list('pk', 'staff_votes_total', 'president_votes_total')}
+        else:
+            actual = {pk: [staff, president] for pk, staff, president in
+                      queryset.values_list('pk', 'staff_votes', 'president_votes')}
+
+        registered = ElectorRegistry.objects.filter(election_id=election).count()
+        mismatched = [pk for pk in expected if expected[pk] != actual.get(pk)]
+        if registered != accepted or mismatched or accepted != len(ballots):
+            raise CommandError(f'Tally mismatch: {accepted}/{len(ballots)} ballots accepted, '
+                               f'{registered} registry rows, {len(mismatched)} candidates with wrong totals')
+        self.stdout.write(self.style.SUCCESS(f'All {accepted} ballots accounted for in the tallies'))
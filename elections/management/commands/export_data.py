@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.helpers.export_helpers import EXPORT_FORMATS, EXPORTS, iter_export
+from elections.models import Person
+
+
+class Command(BaseCommand):
+    help = ('Stream a whole table (persons, elector registries, candidate results or eligibility rolls) '
+            'to a CSV or NDJSON file, optionally gzipped, with constant memory use.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXPORTS))
+        parser.add_argument('--output', choices=sorted(EXPORT_FORMATS), default='csv', help='File format.')
+        parser.add_argument('--gzip', action='store_true', help='Compress the file with gzip.')
+        parser.add_argument('--election', type=int, help='Only rows of this election (not for persons).')
+        parser.add_argument('--file', default='-', help="Destination file, or '-' for standard output.")
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['table']]
+        queryset = export.model.objects.all()
+        if options['election'] is not None:
+            if export.model is Person:
+                raise CommandError('Persons are not exported per election')
+            queryset = queryset.filter(election_id=options['election'])
+
+        started = time.perf_counter()
+        size = 0
+        chunks = iter_export(export, queryset, options['output'], options['gzip'])
+        if options['file'] == '-':
+            if options['gzip']:
+                # El gzip es binario: va al buffer del stdout del comando, si lo tiene
+                stream = getattr(self.stdout, 'buffer', None)
+                if stream is None:
+                    raise CommandError('Standard output does not accept binary data, use --file with --gzip')
+                for chunk in chunks:
+                    stream.write(chunk)
+                stream.flush()
+            else:
+                for chunk in chunks:
+                    self.stdout.write(chunk.decode(), ending='')
+            self.stdout.flush()
+        else:
+            try:
+                with open(options['file'], 'wb') as stream:
+                    for chunk in chunks:
+                        stream.write(chunk)
+                        size += len(chunk)
+            except OSError as e:
+                raise CommandError(f'Cannot write {options["file"]}: {e}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{export.name}: {size} bytes written to {options["file"]} in {time.perf_counter() - started:.1f}s'))
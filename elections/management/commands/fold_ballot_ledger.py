@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.helpers.ledger_helpers import fold_ballot_ledger, rebuild_candidate_totals
+from elections.helpers.tally_helpers import is_ledger_tally
+
+
+class Command(BaseCommand):
+    help = 'Fold new ballots of the ballot ledger into the candidate totals, or rebuild the totals from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Ballots folded per transaction.')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute staff_votes/president_votes from the whole ledger.')
+        parser.add_argument('--election', type=int, help='With --rebuild, only rebuild this election.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuilt = rebuild_candidate_totals(options['election'])
+            self.stdout.write(self.style.SUCCESS(f'{rebuilt} candidates rebuilt'))
+            return
+
+        if not is_ledger_tally():
+            raise CommandError("Folding is only needed with VOTE_TALLY_MODE='ledger'; use --rebuild instead.")
+        folded = fold_ballot_ledger(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{folded} ballots folded'))
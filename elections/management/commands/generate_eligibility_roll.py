@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.helpers.eligibility_helpers import generate_eligibility_roll, refresh_eligibility_roll
+from elections.models import Election
+
+
+class Command(BaseCommand):
+    help = ('Generate the eligibility roll of elections from the people in their scope '
+            '(faculty, campus or institution), with one INSERT ... SELECT per election.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', default=[],
+                            help='Election id; may be given several times.')
+        parser.add_argument('--all', action='store_true', help='Every election.')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Also remove the people that are no longer in scope.')
+
+    def handle(self, *args, **options):
+        if options['all'] == bool(options['election']):
+            raise CommandError('Give either --election or --all')
+        elections = Election.objects.order_by('id')
+        if not options['all']:
+            elections = elections.filter(pk__in=options['election'])
+            missing = set(options['election']) - set(elections.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f'Unknown elections: {", ".join(map(str, sorted(missing)))}')
+
+        for election in elections:
+            started = time.perf_counter()
+            if options['refresh']:
+                added, removed = refresh_eligibility_roll(election)
+            else:
+                added, removed = generate_eligibility_roll(election), 0
+            self.stdout.write(f'{election}: {added} added, {removed} removed '
+                              f'in {time.perf_counter() - started:.1f}s')
+        self.stdout.write(self.style.SUCCESS('Eligibility rolls up to date'))
@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.helpers.import_helpers import PersonImportError, import_persons
+
+
+class Command(BaseCommand):
+    help = ('Import the person roll from a CSV with ci, name, last_name and faculty (name) or faculty_id columns, '
+            'inserting new people and updating existing ones by ci.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, or '-' to read standard input.")
+        parser.add_argument('--chunk-size', type=int, help='Rows validated and loaded per chunk.')
+        parser.add_argument('--delimiter', default=',', help='Field delimiter of the CSV.')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Import the valid rows even if some are rejected.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                summary = self.load(sys.stdin, options)
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                    summary = self.load(stream, options)
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+        except PersonImportError as e:
+            self.report_errors(e.summary)
+            raise CommandError(f'{e.summary["invalid"]} invalid rows, nothing imported (use --skip-invalid)')
+
+        self.report_errors(summary)
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["rows"]} rows read: {summary["created"]} created, {summary["updated"]} updated, '
+            f'{summary["invalid"]} invalid in {time.perf_counter() - started:.1f}s'))
+
+    def load(self, stream, options):
+        return import_persons(stream, options['chunk_size'], options['skip_invalid'], options['delimiter'])
+
+    def report_errors(self, summary):
+        for error in summary['errors']:
+            self.stderr.write(f'Line {error["line"]}: {error["error"]}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from elections.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete the expired Idempotency-Key records.'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} expired idempotency keys deleted'))
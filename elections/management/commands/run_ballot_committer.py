@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from elections.helpers.queue_helpers import drain_ballot_queue
+
+
+class Command(BaseCommand):
+    help = 'Drain the write-behind ballot queue, committing queued ballots in groups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group-size', type=int, help='Ballots committed per transaction.')
+        parser.add_argument('--interval', type=float, default=0.2, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            committed = 0
+            while True:
+                drained = drain_ballot_queue(options['group_size'])
+                if not drained:
+                    break
+                committed += drained
+            if committed:
+                self.stdout.write(f'{committed} ballots committed')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from elections.helpers.tally_helpers import sync_candidate_totals
+
+
+class Command(BaseCommand):
+    help = 'Refresh Candidate.staff_votes and Candidate.president_votes from the sharded vote counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, help='Only refresh the candidates of this election.')
+
+    def handle(self, *args, **options):
+        refreshed = sync_candidate_totals(options['election'])
+        self.stdout.write(self.style.SUCCESS(f'{refreshed} candidates refreshed'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0002_remove_candidate_person_ptr_candidate_person_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateVoteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('staff_votes', models.IntegerField(default=0)),
+                ('president_votes', models.IntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_counters', to='elections.candidate')),
+            ],
+            options={
+                'db_table': 'candidate_vote_counter',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='candidatevotecounter',
+            constraint=models.UniqueConstraint(fields=('candidate', 'slot'), name='unique_candidate_vote_counter'),
+        ),
+    ]
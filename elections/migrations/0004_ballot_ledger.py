@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0003_candidatevotecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TallyCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_ballot_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Ballot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selections', models.JSONField(default=list)),
+                ('cast_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('election_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='elections.election')),
+            ],
+            options={
+                'db_table': 'ballot_ledger',
+            },
+        ),
+    ]
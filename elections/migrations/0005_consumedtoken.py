@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0004_ballot_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=64, unique=True)),
+                ('consumed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'consumed_ballot_token',
+            },
+        ),
+    ]
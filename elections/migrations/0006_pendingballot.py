@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0005_consumedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingBallot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt', models.UUIDField(unique=True)),
+                ('elector_ci', models.CharField(max_length=11)),
+                ('election_id', models.BigIntegerField()),
+                ('selections', models.JSONField(default=list)),
+                ('jti', models.CharField(blank=True, max_length=64, null=True)),
+                ('status', models.CharField(default='queued', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'pending_ballot',
+                'indexes': [models.Index(fields=['status', 'id'], name='pending_ballot_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0008_modelversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['who_added', 'election_id'], name='candidate_added_election_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidatelog',
+            index=models.Index(fields=['who_added', 'election_id'], name='candidate_log_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(fields=['type', 'location_id'], name='election_type_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(fields=['location_id'], name='election_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(fields=['is_active', 'voting_date'], name='election_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(fields=['voting_date'], name='election_voting_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['faculty_id', 'last_name'], name='person_faculty_lastname_idx'),
+        ),
+    ]
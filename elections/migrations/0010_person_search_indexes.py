@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    # Solo PostgreSQL: pg_trgm e índices GIN. La búsqueda en otros motores no los usa.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS person_full_name_trgm_idx ON elections_person "
+        "USING gin ((name || ' ' || last_name) gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS person_full_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0009_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0010_person_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibleElector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ci', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='elections.person')),
+                ('election_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='elections.election')),
+            ],
+            options={
+                'db_table': 'eligible_elector',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='eligibleelector',
+            constraint=models.UniqueConstraint(fields=('election_id', 'ci'), name='unique_eligible_elector'),
+        ),
+    ]
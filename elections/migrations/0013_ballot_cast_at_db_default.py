@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:17
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0012_idempotencykey_locked_until'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ballot',
+            name='cast_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now()),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, Now
 from django.utils import timezone
 
 
@@ -34,9 +37,22 @@ class Person(models.Model):
     last_name = models.CharField(max_length=255)
     faculty_id = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['faculty_id', 'last_name'], name='person_faculty_lastname_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name} {self.last_name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Facultad con la que se leyó la fila: los padrones solo se refrescan si cambia
+        if 'faculty_id_id' in instance.__dict__:
+            instance._loaded_faculty_id = instance.faculty_id_id
+        return instance
+
 
 class Election(models.Model):
     TYPE_CHOICES = [
@@ -50,17 +66,33 @@ class Election(models.Model):
     voting_date = models.DateTimeField(validators=[MinValueValidator(timezone.now)])
     is_active = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['type', 'location_id'], name='election_type_location_idx'),
+            models.Index(fields=['location_id'], name='election_location_idx'),
+            models.Index(fields=['is_active', 'voting_date'], name='election_active_date_idx'),
+            models.Index(fields=['voting_date'], name='election_voting_date_idx'),
+        ]
+
     def __str__(self):
-        if self.type == 'institution':
-            location = Institution.objects.get(pk=self.location_id).name
-        elif self.type == 'campus':
-            location = Campus.objects.get(pk=self.location_id).name
-        else:
-            location = Faculty.objects.get(pk=self.location_id).name
+        from .helpers.location_helpers import resolve_location_name
 
+        location = resolve_location_name(self.type, self.location_id) or f'#{self.location_id}'
         return f'Elecciones de {self.get_type_display()} en {location}'
 
 
+class CandidateQuerySet(models.QuerySet):
+    def with_vote_totals(self):
+        """
+        Annotate each candidate with the sum of its sharded vote counters as
+        ``staff_votes_total`` and ``president_votes_total``.
+        """
+        return self.annotate(
+            staff_votes_total=Coalesce(Sum('vote_counters__staff_votes'), 0),
+            president_votes_total=Coalesce(Sum('vote_counters__president_votes'), 0),
+        )
+
+
 class Candidate(models.Model):
     person = models.OneToOneField(Person, on_delete=models.CASCADE, related_name='candidate', primary_key=True,
                                   default=None)
@@ -80,8 +112,36 @@ class Candidate(models.Model):
     president_votes = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     position = models.CharField(max_length=255, blank=True, null=True)
 
+    objects = CandidateQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['who_added', 'election_id'], name='candidate_added_election_idx'),
+        ]
+
     def __str__(self):
-        return f'{Person.objects.get(pk=self.ci).__str__()}, candidato a {Election.objects.get(pk=self.election_id).__str__()}'
+        return f'{self.person}, candidato a {self.election_id}'
+
+
+class CandidateVoteCounter(models.Model):
+    """
+    One of the ``VOTE_COUNTER_SHARDS`` counter slots of a candidate. Ballots
+    increment a random slot so concurrent voters do not queue on the same row;
+    the candidate totals are the sum of its slots.
+    """
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='vote_counters')
+    slot = models.PositiveSmallIntegerField()
+    staff_votes = models.IntegerField(default=0)
+    president_votes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'candidate_vote_counter'
+        constraints = [
+            models.UniqueConstraint(fields=['candidate', 'slot'], name='unique_candidate_vote_counter')
+        ]
+
+    def __str__(self):
+        return f'{self.candidate_id} [{self.slot}]'
 
 
 class ElectorRegistry(models.Model):
@@ -95,7 +155,145 @@ class ElectorRegistry(models.Model):
         ]
 
     def __str__(self):
-        return f'{Person.objects.get(pk=self.ci).__str__()} votó en {Election.objects.get(pk=self.election_id).__str__()}'
+        return f'{self.ci} votó en {self.election_id}'
+
+
+class EligibleElector(models.Model):
+    """
+    Eligibility roll: a person who may vote in an election, generated from the
+    election scope by ``generate_eligibility_roll``.
+    """
+    ci = models.ForeignKey(Person, on_delete=models.CASCADE)
+    election_id = models.ForeignKey(Election, on_delete=models.CASCADE)
+    added_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'eligible_elector'
+        constraints = [
+            models.UniqueConstraint(fields=['election_id', 'ci'], name='unique_eligible_elector')
+        ]
+
+    def __str__(self):
+        return f'{self.ci_id} puede votar en {self.election_id_id}'
+
+
+class Ballot(models.Model):
+    """
+    Append-only ballot ledger. ``selections`` holds one
+    ``[candidate_pk, staff_votes, president_votes]`` entry per chosen candidate;
+    the elector is deliberately not stored.
+    """
+    election_id = models.ForeignKey(Election, on_delete=models.CASCADE)
+    selections = models.JSONField(default=list)
+    # Hora de la base de datos: el plegado la compara con su propio reloj
+    cast_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = 'ballot_ledger'
+
+    def __str__(self):
+        return f'Boleta {self.pk}'
+
+
+class ConsumedToken(models.Model):
+    """
+    ``jti`` of every ballot token already used to vote, so replays can be
+    rejected with an indexed lookup.
+    """
+    jti = models.CharField(max_length=64, unique=True)
+    consumed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'consumed_ballot_token'
+
+    def __str__(self):
+        return self.jti
+
+
+class PendingBallot(models.Model):
+    """
+    Journal of ballots accepted for write-behind processing. The committer
+    drains ``queued`` rows in groups and records the outcome on each row, which
+    the client polls with its ``receipt``.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_ACCEPTED = 'accepted'
+
+    receipt = models.UUIDField(unique=True)
+    elector_ci = models.CharField(max_length=11)
+    election_id = models.BigIntegerField()
+    selections = models.JSONField(default=list)
+    jti = models.CharField(max_length=64, blank=True, null=True)
+    status = models.CharField(max_length=20, default=STATUS_QUEUED)
+    error = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'pending_ballot'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='pending_ballot_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.receipt} ({self.status})'
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a write request sent with an ``Idempotency-Key`` header.
+    ``status_code`` stays empty while the first request is still running, and
+    ``locked_until`` bounds how long a crashed request keeps the key.
+    """
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    locked_until = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'idempotency_key'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key')
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_key_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope}:{self.key}'
+
+
+class TallyCheckpoint(models.Model):
+    """
+    High-water mark of the ballot ledger aggregator: ballots with an id up to
+    ``last_ballot_id`` are already folded into the candidate totals.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_ballot_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_ballot_id}'
+
+
+class ModelVersion(models.Model):
+    """
+    Write counter of a model, bumped by signals on every save or delete. Used
+    to build the ETags of endpoints serving data that rarely changes.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'model_version'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
 
 
 class CandidateLog(models.Model):
@@ -116,5 +314,10 @@ class CandidateLog(models.Model):
     president_votes = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     position = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['who_added', 'election_id'], name='candidate_log_added_idx'),
+        ]
+
     def __str__(self):
-        return f'{Person.objects.get(pk=self.ci).__str__()}, fue candidato a {Election.objects.get(pk=self.election_id).__str__()}'
+        return f'{self.person}, fue candidato a {self.election_id}'
@@ -0,0 +1,69 @@
+import json
+
+from django.db import connection
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+APPROXIMATE_COUNT = 'approximate'
+
+
+def approximate_count(queryset):
+    """
+    Row count estimated by the PostgreSQL planner from the table statistics,
+    without scanning the rows. Other databases fall back to an exact count.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on the view's ``keyset_ordering``, a unique indexed
+    column: every page is a single ``WHERE key > last ORDER BY key LIMIT n``
+    query, however deep it is. ``?count=approximate`` adds a planner estimate
+    of the total.
+    """
+    ordering = 'pk'
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        return (getattr(view, 'keyset_ordering', self.ordering),)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == APPROXIMATE_COUNT:
+            self.count = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        page = [('next', self.get_next_link()), ('previous', self.get_previous_link()), ('results', data)]
+        if self.count is not None:
+            page.insert(0, ('count', self.count))
+        return Response(dict(page))
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page number pagination unless the request carries a ``cursor`` parameter
+    (empty for the first page), which switches it to ``KeysetPagination``.
+    """
+    cursor_query_param = 'cursor'
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -43,6 +43,29 @@ class IsCandidateManagerOrReadOnly(IsCandidateManager):
         return super().has_permission(request, view)
 
 
+class IsSlateManager(permissions.BasePermission):
+    """
+    Bulk candidate registration: superusers, or candidate managers whose
+    slate only holds candidates of their own election.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user.is_authenticated:
+            return False
+        if user.is_superuser:
+            return True
+        if not user.groups.filter(name='Candidate Managers').exists():
+            return False
+        rows = request.data.get('candidates') if isinstance(request.data, dict) else None
+        if not isinstance(rows, list):
+            return True
+        elections = {str(row.get('election_id')) for row in rows if isinstance(row, dict)}
+        if elections - {str(user.election_id_id)}:
+            raise CustomAPIException("User does not have permission for this election")
+        return True
+
+
 class IsElectionManager(permissions.BasePermission):
     """
     Custom permission to only allow election managers to modify elections.
@@ -0,0 +1,22 @@
+from rest_framework.renderers import JSONRenderer
+
+from .helpers.json_helpers import dumps, orjson
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` on orjson when it is installed. Indented output, asked
+    for through the ``Accept`` header, and installs without orjson keep the
+    stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = dumps(data)
+        # Igual que JSONRenderer: escapa los separadores de línea que rompen JavaScript
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -7,45 +7,78 @@ from .models import *
 logger = logging.getLogger(__name__)
 
 
-class InstitutionSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Reads ``fields`` and ``expand`` from the serializer context (set by
+    ``SparseFieldsetMixin`` on read requests): keeps only the requested fields
+    and renders each relation of ``expandable_fields`` as its primary key
+    unless it is asked to be expanded into the nested serializer.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get('expand')
+        if expand is None:
+            return
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        for name, serializer_class in self.expandable_fields.items():
+            if name not in self.fields:
+                continue
+            if name in expand:
+                self.fields[name] = serializer_class(read_only=True)
+            else:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
+class InstitutionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Institution
         fields = '__all__'
 
 
-class CampusSerializer(serializers.ModelSerializer):
+class CampusSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'institution_id': InstitutionSerializer}
+
     class Meta:
         model = Campus
         fields = '__all__'
 
 
-class FacultySerializer(serializers.ModelSerializer):
+class FacultySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'campus_id': CampusSerializer}
+
     class Meta:
         model = Faculty
         fields = '__all__'
 
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'faculty_id': FacultySerializer}
+
     class Meta:
         model = Person
         fields = ['ci', 'name', 'last_name', 'faculty_id']
 
 
-class ElectionSerializer(serializers.ModelSerializer):
+class ElectionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Election
         fields = '__all__'
 
 
-class CandidateSerializer(serializers.ModelSerializer):
+class CandidateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     person = PersonSerializer()
+    expandable_fields = {'person': PersonSerializer, 'election_id': ElectionSerializer}
 
     class Meta:
         model = Candidate
         fields = ['person', 'election_id', 'biography', 'who_added', 'staff_votes', 'president_votes', 'position']
 
     def create(self, validated_data):
-        print("AAAAAAAAAAAAAAAAAAAAAAAAAAAAAA", validated_data)
         try:
             person_data = validated_data.pop('person')
             person_instance, created = Person.objects.get_or_create(ci=person_data['ci'], defaults=person_data)
@@ -55,14 +88,54 @@ class CandidateSerializer(serializers.ModelSerializer):
 
         return Candidate.objects.create(**validated_data)
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Con contadores fragmentados los totales salen de la anotación del queryset
+        if hasattr(instance, 'staff_votes_total'):
+            if 'staff_votes' in data:
+                data['staff_votes'] = instance.staff_votes_total
+            if 'president_votes' in data:
+                data['president_votes'] = instance.president_votes_total
+        return data
+
+
+class SlatePersonSerializer(serializers.Serializer):
+    ci = serializers.CharField(max_length=11)
+    name = serializers.CharField(max_length=255)
+    last_name = serializers.CharField(max_length=255)
+    faculty_id = serializers.IntegerField(required=False, allow_null=True)
+
+
+class SlateCandidateSerializer(serializers.Serializer):
+    """
+    One row of a bulk candidate registration. Same shape as
+    ``CandidateSerializer`` input, but validated without touching the
+    database; elections, faculties and existing candidacies are checked for
+    the whole slate at once by ``register_candidates``.
+    """
+    person = SlatePersonSerializer()
+    election_id = serializers.IntegerField()
+    biography = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    who_added = serializers.ChoiceField(choices=Candidate.WHO_ADDED_CHOICES)
+    position = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, attrs):
+        if self.initial_data.get('staff_votes') or self.initial_data.get('president_votes'):
+            raise serializers.ValidationError("You cannot alter the election's result")
+        return attrs
+
+
+class ElectorRegistrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'ci': PersonSerializer, 'election_id': ElectionSerializer}
 
-class ElectorRegistrySerializer(serializers.ModelSerializer):
     class Meta:
         model = ElectorRegistry
         fields = '__all__'
 
 
-class CandidateLogSerializer(serializers.ModelSerializer):
+class CandidateLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'person': PersonSerializer, 'election_id': ElectionSerializer}
+
     class Meta:
         model = CandidateLog
         fields = '__all__'
\ No newline at end of file
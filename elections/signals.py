@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .helpers.eligibility_helpers import refresh_person_eligibility
+from .helpers.version_helpers import bump_model_version
+from .models import Campus, Faculty, Institution, Person
+
+UNKNOWN_FACULTY = object()
+
+
+@receiver(post_save, sender=Institution)
+@receiver(post_save, sender=Campus)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Institution)
+@receiver(post_delete, sender=Campus)
+@receiver(post_delete, sender=Faculty)
+def bump_location_version(sender, **kwargs):
+    bump_model_version(sender)
+
+
+@receiver(post_save, sender=Person)
+def refresh_eligibility(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # Solo cuando la facultad cambió; las cargas masivas refrescan los padrones aparte
+    if raw or (update_fields is not None and 'faculty_id' not in update_fields):
+        return
+    # Una persona nueva no estaba en ningún padrón; sin from_db no se sabe qué facultad tenía
+    previous = None if created else getattr(instance, '_loaded_faculty_id', UNKNOWN_FACULTY)
+    if previous == instance.faculty_id_id:
+        return
+    refresh_person_eligibility(instance)
+    instance._loaded_faculty_id = instance.faculty_id_id
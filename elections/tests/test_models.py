@@ -1,22 +1,54 @@
+import asyncio
+import csv
+import gzip
+import io
 import json
+import os
+import tempfile
 import unittest
+import uuid
 from datetime import timedelta
-from unittest.mock import MagicMock
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
 
 import jwt
 from decouple import config
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.http import JsonResponse
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from elections.helpers.archive_helpers import archive_election
+from elections.helpers.ballot_helpers import commit_ballot
+from elections.helpers.eligibility_helpers import generate_eligibility_roll, refresh_eligibility_roll
+from elections.helpers.import_helpers import import_persons
+from elections.helpers.json_helpers import iter_json_array
+from elections.helpers.ledger_helpers import fold_ballot_ledger
 from elections.helpers.permission_helpers import verification_token
+from elections.helpers.results_helpers import RESULTS_FRESH_KEY, RESULTS_LOCK_KEY
+from elections.helpers.serializer_helpers import values_serializer_for
+from elections.helpers.stream_helpers import ElectionChannel, Subscription, results_delta
+from elections.helpers.token_helpers import (BloomFilter, get_ballot_signing_key, replay_filter,
+                                             verify_ballot_token)
 from elections.models import *
+from user_management.models import CustomUser, CustomUserLog
 from .factory.models_factory import *
-from ..serializers import ElectorRegistrySerializer
+from ..parsers import FastJSONParser
+from ..renderers import FastJSONRenderer
+from ..views import (CandidateLogViewSet, CandidateViewSet, ElectionViewSet, ElectorRegistryViewSet,
+                     PersonViewSet)
+from ..serializers import (CandidateLogSerializer, ElectorRegistrySerializer, InstitutionSerializer,
+                           PersonSerializer)
 
 
 class VerificarTokenTest(unittest.TestCase):
@@ -666,6 +698,50 @@ class ElectorRegistryViewSetTest(TestCase):
         # Assert that the response status is HTTP 400 Bad Request
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_elector_registry_twice(self):
+        candidate = CandidateFactory()
+        data = {
+            'elector': {'ci': self.person.ci, 'election_id': self.election.id},
+            'candidates': {candidate.person.ci: {'staff_votes': True, 'president_votes': True}}
+        }
+        token = jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+        url = reverse('electorregistry-list')
+
+        self.assertEqual(self.client.post(url, {'token': token}, format='json').status_code,
+                         status.HTTP_201_CREATED)
+        response = self.client.post(url, {'token': token}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(ElectorRegistry.objects.filter(ci=self.person, election_id=self.election).count(), 1)
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.staff_votes, 1)
+        self.assertEqual(candidate.president_votes, 1)
+
+    def test_create_elector_registry_unknown_elector(self):
+        candidate = CandidateFactory()
+        data = {
+            'elector': {'ci': '00000000000', 'election_id': self.election.id},
+            'candidates': {candidate.person.ci: {'staff_votes': True, 'president_votes': False}}
+        }
+        token = jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+        response = self.client.post(reverse('electorregistry-list'), {'token': token}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.staff_votes, 0)
+
+    def test_create_elector_registry_query_count(self):
+        candidates = CandidateFactory.create_batch(3)
+        data = {
+            'elector': {'ci': self.person.ci, 'election_id': self.election.id},
+            'candidates': {c.person.ci: {'staff_votes': True, 'president_votes': False} for c in candidates}
+        }
+        token = jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+        # Reclamo del registro, boleta en el libro y un único UPDATE (más el savepoint de la transacción)
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('electorregistry-list'), {'token': token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
     def test_retrieve_elector_registry(self):
         elector_registry = ElectorRegistry.objects.create(ci=self.person, election_id=self.election)
 
@@ -675,6 +751,1390 @@ class ElectorRegistryViewSetTest(TestCase):
         assert response.data == ElectorRegistrySerializer(elector_registry).data
 
 
+class ElectorRegistryBatchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.election = ElectionFactory()
+        self.candidate = CandidateFactory(election_id=self.election)
+        self.url = reverse('electorregistry-batch')
+
+    def token(self, ci, president_votes=False):
+        data = {
+            'elector': {'ci': ci, 'election_id': self.election.id},
+            'candidates': {self.candidate.person.ci: {'staff_votes': True, 'president_votes': president_votes}}
+        }
+        return jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+
+    def test_batch_reports_status_per_ballot(self):
+        people = PersonFactory.create_batch(3)
+        ElectorRegistry.objects.create(ci=people[2], election_id=self.election)
+        tokens = [
+            self.token(people[0].ci, president_votes=True),
+            self.token(people[1].ci),
+            self.token(people[0].ci),
+            self.token(people[2].ci),
+            self.token('00000000000'),
+            'not-a-token',
+            jwt.encode({'exp': 1}, config('SECRET_KEY'), algorithm='HS256'),
+        ]
+        response = self.client.post(self.url, {'tokens': tokens}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['accepted', 'accepted', 'duplicate', 'duplicate', 'not_found', 'invalid', 'expired'])
+        self.candidate.refresh_from_db()
+        self.assertEqual(self.candidate.staff_votes, 2)
+        self.assertEqual(self.candidate.president_votes, 1)
+        self.assertEqual(ElectorRegistry.objects.filter(election_id=self.election).count(), 3)
+        self.assertEqual(Ballot.objects.count(), 2)
+
+    def test_batch_query_count_does_not_grow_with_size(self):
+        tokens = [self.token(person.ci) for person in PersonFactory.create_batch(50)]
+        # personas, elecciones, reclamo del registro, libro de boletas y un UPDATE (más el savepoint)
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, {'tokens': tokens}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.candidate.refresh_from_db()
+        self.assertEqual(self.candidate.staff_votes, 50)
+
+    def test_batch_without_tokens(self):
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BALLOT_BATCH_MAX_SIZE=1)
+    def test_batch_too_large(self):
+        tokens = [self.token(person.ci) for person in PersonFactory.create_batch(2)]
+        response = self.client.post(self.url, {'tokens': tokens}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BallotTokenVerificationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.election = ElectionFactory()
+        self.candidate = CandidateFactory(election_id=self.election)
+        replay_filter.reset()
+        self.addCleanup(replay_filter.reset)
+
+    def token(self, person, jti):
+        data = {
+            'jti': jti,
+            'elector': {'ci': person.ci, 'election_id': self.election.id},
+            'candidates': {self.candidate.person.ci: {'staff_votes': True, 'president_votes': False}}
+        }
+        return jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+
+    def test_replayed_token_is_rejected_without_writes(self):
+        token = self.token(PersonFactory(), 'replay-test-jti')
+        url = reverse('electorregistry-list')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url, {'token': token}, format='json').status_code,
+                             status.HTTP_201_CREATED)
+        self.assertTrue(ConsumedToken.objects.filter(jti='replay-test-jti').exists())
+
+        # Solo la confirmación en la tabla indexada tras el acierto del filtro
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'token': token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error'], 'Token has already been used')
+        self.candidate.refresh_from_db()
+        self.assertEqual(self.candidate.staff_votes, 1)
+
+    @override_settings(BALLOT_REPLAY_FILTER_REFRESH=0)
+    def test_filter_catches_up_with_other_workers(self):
+        self.assertFalse(replay_filter.is_consumed('other-worker-jti'))
+        # Consumido por otro proceso: este filtro no lo vio pasar
+        ConsumedToken.objects.create(jti='other-worker-jti')
+        # Lectura incremental por id y confirmación en la tabla
+        with self.assertNumQueries(2):
+            self.assertTrue(replay_filter.is_consumed('other-worker-jti'))
+
+    def test_batch_consumes_token_ids(self):
+        tokens = [self.token(person, f'batch-test-jti-{i}') for i, person in enumerate(PersonFactory.create_batch(2))]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('electorregistry-batch'), {'tokens': tokens}, format='json')
+        response = self.client.post(reverse('electorregistry-batch'), {'tokens': tokens}, format='json')
+
+        self.assertEqual([result['status'] for result in response.data['results']], ['replayed', 'replayed'])
+        self.assertEqual(ConsumedToken.objects.filter(jti__startswith='batch-test-jti-').count(), 2)
+
+    def test_signing_key_is_read_once(self):
+        token = self.token(PersonFactory(), 'key-test-jti')
+        get_ballot_signing_key.cache_clear()
+        try:
+            with unittest.mock.patch('elections.helpers.token_helpers.config',
+                                     return_value=config('SECRET_KEY')) as mock_config:
+                verify_ballot_token(token)
+                verify_ballot_token(jwt.encode({'jti': 'other'}, config('SECRET_KEY'), algorithm='HS256'))
+            mock_config.assert_called_once_with('SECRET_KEY')
+        finally:
+            get_ballot_signing_key.cache_clear()
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Maximum number of queries per endpoint and action. List budgets must hold
+    for a partial and for a full page alike.
+    """
+    # Las jerarquías consultan además su contador de escrituras para el ETag
+    LIST_BUDGETS = {
+        'institution-list': 3,
+        'campus-list': 3,
+        'faculty-list': 3,
+        'person-list': 2,
+        'election-list': 2,
+        'candidate-list': 2,
+        'electorregistry-list': 2,
+        'candidatelog-list': 2,
+    }
+    DETAIL_BUDGETS = {
+        'institution-detail': 2,
+        'campus-detail': 2,
+        'faculty-detail': 2,
+        'person-detail': 1,
+        'election-detail': 1,
+        'candidate-detail': 1,
+        'electorregistry-detail': 1,
+        'candidatelog-detail': 1,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def seed(self, count):
+        for _ in range(count):
+            candidate = CandidateFactory()
+            ElectorRegistry.objects.create(ci=candidate.person, election_id=candidate.election_id)
+            CandidateLog.objects.create(person=candidate.person, election_id=candidate.election_id,
+                                        who_added='committee')
+
+    def assertWithinBudget(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), budget, [query['sql'] for query in queries])
+
+    def test_list_budgets(self):
+        for rows in (2, 12):
+            self.seed(rows if rows == 2 else rows - 2)
+            for name, budget in self.LIST_BUDGETS.items():
+                with self.subTest(endpoint=name, rows=rows):
+                    self.assertWithinBudget(reverse(name), budget)
+
+    def test_detail_budgets(self):
+        self.seed(1)
+        pks = {
+            'institution-detail': Institution.objects.get().pk,
+            'campus-detail': Campus.objects.get().pk,
+            'faculty-detail': Faculty.objects.get().pk,
+            'person-detail': Person.objects.get().pk,
+            'election-detail': Election.objects.get().pk,
+            'candidate-detail': Candidate.objects.get().pk,
+            'electorregistry-detail': ElectorRegistry.objects.get().pk,
+            'candidatelog-detail': CandidateLog.objects.get().pk,
+        }
+        for name, budget in self.DETAIL_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertWithinBudget(reverse(name, args=[pks[name]]), budget)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.persons = sorted(PersonFactory.create_batch(23), key=lambda person: person.ci)
+
+    def test_walks_every_page_in_key_order(self):
+        url, seen = reverse('person-list') + '?cursor=', []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('COUNT', queries[0]['sql'].upper())
+            self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+            self.assertNotIn('count', response.data)
+            seen += [person['ci'] for person in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [person.ci for person in self.persons])
+
+    def test_cursor_is_opaque_and_goes_back(self):
+        first = self.client.get(reverse('person-list') + '?cursor=').data
+        self.assertNotIn(self.persons[9].ci, first['next'])
+        second = self.client.get(first['next']).data
+        self.assertEqual(second['results'][0]['ci'], self.persons[10].ci)
+        previous = self.client.get(second['previous']).data
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_approximate_count(self):
+        response = self.client.get(reverse('person-list') + '?cursor=&count=approximate')
+        self.assertIn('count', response.data)
+        self.assertGreaterEqual(response.data['count'], 0)
+
+    def test_page_numbers_stay_default(self):
+        response = self.client.get(reverse('person-list') + '?page=3')
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_elector_registry_keyset(self):
+        for person in self.persons[:12]:
+            ElectorRegistry.objects.create(ci=person, election_id=ElectionFactory())
+        first = self.client.get(reverse('electorregistry-list') + '?cursor=').data
+        second = self.client.get(first['next']).data
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(ids, sorted(ElectorRegistry.objects.values_list('id', flat=True)))
+
+
+class ValuesSerializerParityTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.persons = PersonFactory.create_batch(3) + [Person.objects.create(ci='00000000001', name='Sin',
+                                                                             last_name='Facultad')]
+        election = ElectionFactory()
+        for person in self.persons:
+            ElectorRegistry.objects.create(ci=person, election_id=election)
+            CandidateLog.objects.create(person=person, election_id=election, who_added='elector')
+        CandidateLog.objects.create(person=self.persons[0], election_id=election, who_added='committee',
+                                    biography='Biografía', staff_votes=4, president_votes=1, position='Decano')
+
+    def assertParity(self, serializer_class, queryset):
+        expected = serializer_class(queryset, many=True).data
+        values_serializer = values_serializer_for(serializer_class)
+        self.assertEqual(values_serializer.render_many(values_serializer.values(queryset)), expected)
+
+    def test_parity_with_model_serializers(self):
+        self.assertParity(PersonSerializer, Person.objects.order_by('ci'))
+        self.assertParity(ElectorRegistrySerializer, ElectorRegistry.objects.order_by('id'))
+        self.assertParity(CandidateLogSerializer, CandidateLog.objects.order_by('id'))
+        self.assertParity(InstitutionSerializer, Institution.objects.order_by('id'))
+
+    def test_list_endpoint_renders_same_json(self):
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(reverse('candidatelog-list')).content
+        self.assertEqual(self.client.get(reverse('candidatelog-list')).content, expected)
+
+    def test_keyset_pages_over_values(self):
+        response = self.client.get(reverse('person-list') + '?cursor=')
+        self.assertEqual([row['ci'] for row in response.data['results']], sorted(p.ci for p in self.persons))
+
+    def test_benchmark_serializers_command(self):
+        out = io.StringIO()
+        call_command('benchmark_serializers', rows=20, repeat=1, stdout=out)
+        for serializer_class in ('PersonSerializer', 'CustomUserLogSerializer', 'CustomUserSerializer'):
+            self.assertIn(f'{serializer_class}: 20 rows', out.getvalue())
+        self.assertIn('ms/1k rows', out.getvalue())
+        self.assertEqual(Person.objects.count(), 4)
+
+
+class FastJSONTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_renderer_matches_drf_output(self):
+        data = {'name': 'Ñandú\u2028', 'at': timezone.now(), 'amount': Decimal('1.50'), 'id': uuid.uuid4(),
+                'items': [1, None, True, 2.5], 'nested': {'empty': []}}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_parser(self):
+        body = io.BytesIO('{"name": "Ñandú", "tokens": [1, 2]}'.encode())
+        self.assertEqual(FastJSONParser().parse(body), {'name': 'Ñandú', 'tokens': [1, 2]})
+
+    def test_malformed_body_is_a_bad_request(self):
+        response = self.client.post(reverse('electorregistry-list'), '{"token": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_iter_json_array_chunks(self):
+        for count in (0, 1, 3, 4, 7):
+            with self.subTest(count=count):
+                chunks = list(iter_json_array(({'n': n} for n in range(count)), chunk_size=2))
+                self.assertEqual(json.loads(b''.join(chunks)), [{'n': n} for n in range(count)])
+                self.assertLessEqual(len(chunks), count // 2 + 2)
+
+    @override_settings(JSON_STREAM_CHUNK_SIZE=5)
+    def test_streamed_list(self):
+        PersonFactory.create_batch(12)
+        response = self.client.get(reverse('person-list') + '?stream=true')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        streamed = json.loads(b''.join(response.streaming_content))
+        expected = PersonSerializer(Person.objects.all(), many=True).data
+        self.assertEqual(sorted(streamed, key=lambda p: p['ci']), sorted(expected, key=lambda p: p['ci']))
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.superadmin_user = get_user_model().objects.create_superuser(username='admin', password='adminpassword')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.institution = InstitutionFactory()
+
+    def test_list_sends_validators(self):
+        response = self.client.get(reverse('institution-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_if_none_match_answers_304_without_queries(self):
+        etag = self.client.get(reverse('institution-list'))['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('institution-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 0)
+        self.assertFalse(response.content)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(reverse('institution-list'))['Last-Modified']
+        response = self.client.get(reverse('institution-list'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(reverse('institution-list'))['ETag']
+        self.client.force_authenticate(user=self.superadmin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('institution-detail', args=[self.institution.id]), {'name': 'Nueva'})
+        response = self.client.get(reverse('institution-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['name'], 'Nueva')
+
+    def test_cascaded_delete_changes_child_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CampusFactory(institution_id=self.institution)
+        etag = self.client.get(reverse('campus-list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.institution.delete()
+        self.assertNotEqual(self.client.get(reverse('campus-list'))['ETag'], etag)
+
+    def test_parent_rename_changes_expanded_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            faculty = FacultyFactory(campus_id=CampusFactory(institution_id=self.institution))
+        url = reverse('faculty-list') + '?expand=campus_id'
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=self.superadmin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('campus-detail', args=[faculty.campus_id_id]), {'name': 'Renombrada'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['campus_id']['name'], 'Renombrada')
+
+    def test_etag_depends_on_the_query(self):
+        first = self.client.get(reverse('institution-list'))['ETag']
+        self.assertNotEqual(self.client.get(reverse('institution-list') + '?page=1')['ETag'], first)
+
+    def test_writes_are_not_conditional(self):
+        self.client.force_authenticate(user=self.superadmin_user)
+        response = self.client.post(reverse('institution-list'), {'name': 'Otra'}, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('ETag', response)
+
+
+class HierarchyTreeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.faculty = FacultyFactory()
+            self.other_faculty = FacultyFactory(campus_id=self.faculty.campus_id)
+            self.empty_institution = InstitutionFactory()
+        self.persons = PersonFactory.create_batch(3, faculty_id=self.faculty)
+        ElectorRegistry.objects.create(ci=self.persons[0], election_id=ElectionFactory())
+
+    def test_tree(self):
+        response = self.client.get(reverse('hierarchy-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        campus = self.faculty.campus_id
+        self.assertEqual(json.loads(response.content), [
+            {'id': campus.institution_id.id, 'name': campus.institution_id.name, 'campuses': [
+                {'id': campus.id, 'name': campus.name, 'faculties': [
+                    {'id': self.faculty.id, 'name': self.faculty.name},
+                    {'id': self.other_faculty.id, 'name': self.other_faculty.name},
+                ]},
+            ]},
+            {'id': self.empty_institution.id, 'name': self.empty_institution.name, 'campuses': []},
+        ])
+        self.assertIn('ETag', response)
+
+    def test_counts(self):
+        tree = json.loads(self.client.get(reverse('hierarchy-list') + '?counts=true').content)
+        campus = tree[0]['campuses'][0]
+        self.assertEqual((tree[0]['persons'], tree[0]['electors']), (3, 1))
+        self.assertEqual((campus['persons'], campus['electors']), (3, 1))
+        self.assertEqual([(f['persons'], f['electors']) for f in campus['faculties']], [(3, 1), (0, 0)])
+        self.assertEqual((tree[1]['persons'], tree[1]['electors']), (0, 0))
+
+    def test_served_from_cache_until_a_write(self):
+        self.client.get(reverse('hierarchy-list'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('hierarchy-list'))
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.faculty.name = 'Facultad Renombrada'
+            self.faculty.save()
+        self.assertIn(b'Facultad Renombrada', self.client.get(reverse('hierarchy-list')).content)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('hierarchy-list'), {})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.candidate = CandidateFactory(biography='Una biografía muy larga')
+        ElectorRegistry.objects.create(ci=self.candidate.person, election_id=self.candidate.election_id)
+
+    def test_fields_narrow_output_and_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('candidate-list') + '?fields=person,staff_votes')
+        self.assertEqual(response.data['results'], [{'person': self.candidate.pk, 'staff_votes': 0}])
+        self.assertFalse([query for query in queries if 'biography' in query['sql']])
+
+    def test_person_is_collapsed_unless_expanded(self):
+        response = self.client.get(reverse('candidate-detail', args=[self.candidate.pk]))
+        self.assertEqual(response.data['person'], self.candidate.pk)
+        self.assertEqual(response.data['biography'], 'Una biografía muy larga')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('candidate-detail', args=[self.candidate.pk]) + '?expand=person')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['person'], PersonSerializer(self.candidate.person).data)
+
+    def test_values_lists_expand_and_narrow(self):
+        response = self.client.get(reverse('electorregistry-list') + '?fields=ci,election_id&expand=ci')
+        self.assertEqual(response.data['results'], [{'ci': PersonSerializer(self.candidate.person).data,
+                                                     'election_id': self.candidate.election_id.id}])
+
+        response = self.client.get(reverse('person-list') + '?fields=name&cursor=')
+        self.assertEqual(response.data['results'], [{'name': self.candidate.person.name}])
+
+    def test_unknown_fields_are_ignored(self):
+        response = self.client.get(reverse('institution-list') + '?fields=name,nope')
+        self.assertEqual(list(response.data['results'][0]), ['name'])
+
+    def test_writes_keep_nested_person(self):
+        superadmin_user = get_user_model().objects.create_superuser(username='admin', password='adminpassword')
+        self.client.force_authenticate(user=superadmin_user)
+        response = self.client.patch(reverse('candidate-detail', args=[self.candidate.pk]) + '?fields=position',
+                                     {'position': 'Rector'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['person']['ci'], self.candidate.pk)
+
+
+class IndexedFilterTest(TestCase):
+    SAMPLES = {
+        'faculty_id': '1',
+        'is_active': 'true',
+        'type': 'faculty',
+        'location_id': '1',
+        'voting_date_after': '2026-01-01',
+        'voting_date_before': '2026-12-31T23:59:59',
+        'election_id': '1',
+        'who_added': 'committee',
+        'ci': '12345678901',
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Con tablas de prueba diminutas el planificador prefiere leerlas enteras
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan TO off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, plan):
+        if connection.vendor == 'postgresql':
+            self.assertIn('Index', plan)
+            self.assertNotIn('Seq Scan', plan)
+        else:
+            self.assertRegex(plan, r'SEARCH \S+ USING (COVERING )?INDEX')
+            self.assertNotRegex(plan, r'\bSCAN\b')
+
+    def test_every_filter_uses_an_index(self):
+        for viewset in (PersonViewSet, ElectionViewSet, CandidateViewSet, ElectorRegistryViewSet,
+                        CandidateLogViewSet):
+            for param, declared in viewset.filterset_fields.items():
+                value = declared.parse(self.SAMPLES[param])
+                if isinstance(value, bool) and connection.vendor == 'sqlite':
+                    # SQLite no usa índices para WHERE "columna" booleana; PostgreSQL sí
+                    continue
+                with self.subTest(viewset=viewset.__name__, param=param):
+                    queryset = viewset.queryset.model.objects.filter(**{declared.lookup: value})
+                    self.assertUsesIndex(self.explain(queryset))
+
+    def test_filters_and_ordering(self):
+        first, second = ElectionFactory.create_batch(2, type='faculty', is_active=True)
+        ElectionFactory(type='campus', is_active=False)
+        CandidateFactory(election_id=first, who_added='committee')
+        CandidateFactory(election_id=first, who_added='elector')
+        CandidateFactory(election_id=second, who_added='committee')
+
+        response = self.client.get(reverse('election-list') + '?type=faculty&is_active=true&ordering=-voting_date')
+        expected = sorted([first, second], key=lambda election: election.voting_date, reverse=True)
+        self.assertEqual([row['id'] for row in response.data['results']], [election.id for election in expected])
+
+        response = self.client.get(reverse('candidate-list') + f'?election_id={first.id}&who_added=committee')
+        self.assertEqual(response.data['count'], 1)
+
+        faculty = FacultyFactory()
+        CandidateFactory(election_id=first, person__faculty_id=faculty)
+        response = self.client.get(reverse('candidate-list') + f'?faculty_id={faculty.id}')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_invalid_values_are_rejected(self):
+        response = self.client.get(reverse('election-list') + '?is_active=maybe&voting_date_after=ayer')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'is_active', 'voting_date_after'})
+
+    def test_ordering_is_limited_to_indexed_fields(self):
+        PersonFactory.create_batch(3)
+        response = self.client.get(reverse('person-list') + '?ordering=-name')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('person-list') + '?ordering=-name')
+        self.assertFalse([query for query in queries if '"name" DESC' in query['sql']])
+
+
+class PersonSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        faculty = FacultyFactory()
+        self.maria = Person.objects.create(ci='85010112345', name='María', last_name='González', faculty_id=faculty)
+        self.mario = Person.objects.create(ci='85010154321', name='Mario', last_name='Pérez', faculty_id=faculty)
+        self.ana = Person.objects.create(ci='90020212345', name='Ana', last_name='Gonzalo', faculty_id=faculty)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('person-search'), {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['ci'] for row in response.data['results']]
+
+    def test_ci_prefix(self):
+        self.assertEqual(self.search('850101'), [self.maria.ci, self.mario.ci])
+
+    def test_partial_names(self):
+        self.assertEqual(set(self.search('gonz')), {self.maria.ci, self.ana.ci})
+        self.assertEqual(self.search('María González'), [self.maria.ci])
+
+    def test_result_shape_and_limit(self):
+        response = self.client.get(reverse('person-search'), {'q': 'gonz', 'limit': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(set(response.data['results'][0]), {'ci', 'name', 'last_name', 'faculty_id', 'rank'})
+
+    def test_prefix_matches_rank_first(self):
+        Person.objects.create(ci='70030312345', name='Rosa', last_name='Margonzi')
+        self.assertEqual(self.search('gonz')[-1], '70030312345')
+
+    def test_short_queries_are_rejected(self):
+        response = self.client.get(reverse('person-search'), {'q': 'a'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PersonImportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superadmin_user = get_user_model().objects.create_superuser(username='admin', password='adminpassword')
+        self.faculty = FacultyFactory(name='Informática')
+        self.existing = Person.objects.create(ci='85010112345', name='Maria', last_name='Gonzalez')
+
+    def roll(self, *lines):
+        return '\n'.join(('ci,name,last_name,faculty', *lines)) + '\n'
+
+    def test_import_creates_and_updates(self):
+        out = io.StringIO()
+        csv_roll = self.roll('85010112345,María,González,informática', '90020212345,Ana,Pérez,',
+                             '90020212345,Ana,Pérez Díaz,Informática')
+        with open(self.tmp_path(csv_roll), encoding='utf-8') as stream:
+            summary = import_persons(stream)
+
+        self.assertEqual((summary['rows'], summary['created'], summary['updated'], summary['invalid']), (3, 1, 1, 0))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.faculty_id), ('María', self.faculty))
+        self.assertEqual(Person.objects.get(ci='90020212345').last_name, 'Pérez Díaz')
+        call_command('import_persons', self.tmp_path(csv_roll), stdout=out)
+        self.assertIn('0 created, 0 updated', out.getvalue())
+
+    def test_chunks(self):
+        rows = [f'9{n:010d},Nombre{n},Apellido{n},' for n in range(7)]
+        summary = import_persons(io.StringIO(self.roll(*rows)), chunk_size=3)
+        self.assertEqual((summary['rows'], summary['created']), (7, 7))
+        self.assertEqual(Person.objects.filter(ci__startswith='9').count(), 7)
+
+    def test_invalid_rows_roll_back(self):
+        path = self.tmp_path(self.roll('90020212345,Ana,Pérez,', ',Sin,Ci,', '70030312345,Rosa,Mar,Medicina'))
+        with self.assertRaisesMessage(Exception, '2 invalid rows'):
+            call_command('import_persons', path, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Person.objects.filter(ci='90020212345').exists())
+
+        call_command('import_persons', path, skip_invalid=True, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertTrue(Person.objects.filter(ci='90020212345').exists())
+
+    def test_upload_endpoint(self):
+        upload = io.BytesIO(self.roll('90020212345,Ana,Pérez,Informática', 'x' * 12 + ',A,B,').encode())
+        upload.name = 'roll.csv'
+        self.client.force_authenticate(user=self.superadmin_user)
+        response = self.client.post(reverse('person-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], [{'line': 3, 'error': 'ci must have between 1 and 11 characters'}])
+
+        upload.seek(0)
+        response = self.client.post(reverse('person-import'), {'file': upload, 'skip_invalid': 'true'},
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+
+    def test_upload_is_admin_only(self):
+        upload = io.BytesIO(self.roll().encode())
+        upload.name = 'roll.csv'
+        response = self.client.post(reverse('person-import'), {'file': upload}, format='multipart')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def tmp_path(self, content):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+
+class EligibilityRollTest(TestCase):
+    def setUp(self):
+        self.faculty = FacultyFactory()
+        self.sibling = FacultyFactory(campus_id=self.faculty.campus_id)
+        self.outsider = FacultyFactory()
+        self.persons = PersonFactory.create_batch(2, faculty_id=self.faculty)
+        self.colleague = PersonFactory(faculty_id=self.sibling)
+        self.stranger = PersonFactory(faculty_id=self.outsider)
+        self.elections = {
+            'faculty': ElectionFactory(type='faculty', location_id=self.faculty.pk),
+            'campus': ElectionFactory(type='campus', location_id=self.faculty.campus_id_id),
+            'institution': ElectionFactory(type='institution',
+                                           location_id=self.faculty.campus_id.institution_id_id),
+        }
+
+    def roll(self, election):
+        return set(EligibleElector.objects.filter(election_id=election).values_list('ci_id', flat=True))
+
+    def test_generate_per_scope(self):
+        cis = {person.ci for person in self.persons}
+        for election in self.elections.values():
+            with self.assertNumQueries(1):
+                generate_eligibility_roll(election)
+        self.assertEqual(self.roll(self.elections['faculty']), cis)
+        self.assertEqual(self.roll(self.elections['campus']), cis | {self.colleague.ci})
+        self.assertEqual(self.roll(self.elections['institution']), cis | {self.colleague.ci})
+        self.assertEqual(generate_eligibility_roll(self.elections['faculty']), 0)
+
+    def test_faculty_change_refreshes_rolls(self):
+        for election in self.elections.values():
+            generate_eligibility_roll(election)
+        moved = self.persons[0]
+        moved.faculty_id = self.sibling
+        moved.save()
+        self.assertNotIn(moved.ci, self.roll(self.elections['faculty']))
+        self.assertIn(moved.ci, self.roll(self.elections['campus']))
+
+        self.stranger.faculty_id = self.faculty
+        self.stranger.save()
+        self.assertIn(self.stranger.ci, self.roll(self.elections['faculty']))
+        self.assertIn(self.stranger.ci, self.roll(self.elections['institution']))
+
+    def test_save_without_faculty_change_skips_refresh(self):
+        generate_eligibility_roll(self.elections['faculty'])
+        person = Person.objects.get(pk=self.persons[0].pk)
+        person.name = 'Renombrada'
+        with self.assertNumQueries(1):
+            person.save()
+        with self.assertNumQueries(1):
+            Person.objects.create(ci='99999999999', name='Sin', last_name='Facultad')
+        self.assertIn(person.ci, self.roll(self.elections['faculty']))
+
+    def test_refresh_after_bulk_update(self):
+        generate_eligibility_roll(self.elections['faculty'])
+        Person.objects.filter(pk=self.persons[0].pk).update(faculty_id=self.outsider)
+        Person.objects.filter(pk=self.colleague.pk).update(faculty_id=self.faculty)
+        self.assertEqual(refresh_eligibility_roll(self.elections['faculty']), (1, 1))
+        self.assertEqual(self.roll(self.elections['faculty']), {self.persons[1].ci, self.colleague.ci})
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('generate_eligibility_roll', election=[self.elections['campus'].pk], stdout=out)
+        self.assertIn('3 added, 0 removed', out.getvalue())
+        call_command('generate_eligibility_roll', all=True, refresh=True, stdout=out)
+        self.assertEqual(EligibleElector.objects.count(), 8)
+        with self.assertRaisesMessage(Exception, 'Unknown elections: 0'):
+            call_command('generate_eligibility_roll', election=[0], stdout=out)
+
+    @override_settings(ENFORCE_ELIGIBILITY=True)
+    def test_enforced_voting(self):
+        election = self.elections['faculty']
+        candidate = CandidateFactory(election_id=election)
+        generate_eligibility_roll(election)
+
+        def token(person):
+            data = {'elector': {'ci': person.ci, 'election_id': election.id},
+                    'candidates': {candidate.person.ci: {'staff_votes': True, 'president_votes': False}}}
+            return jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+
+        client = APIClient()
+        response = client.post(reverse('electorregistry-list'), {'token': token(self.stranger)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = client.post(reverse('electorregistry-list'), {'token': token(self.persons[0])}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        unknown = PersonFactory.build()
+        response = client.post(reverse('electorregistry-list'), {'token': token(unknown)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        tokens = [token(self.persons[1]), token(self.colleague), token(self.persons[0]), token(unknown)]
+        response = client.post(reverse('electorregistry-batch'), {'tokens': tokens}, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['accepted', 'ineligible', 'duplicate', 'not_found'])
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.staff_votes, 2)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superadmin_user = get_user_model().objects.create_superuser(username='admin', password='adminpassword')
+        self.client.force_authenticate(user=self.superadmin_user)
+        self.election = ElectionFactory()
+        self.persons = sorted(PersonFactory.create_batch(5), key=lambda person: person.ci)
+        for person in self.persons[:3]:
+            ElectorRegistry.objects.create(ci=person, election_id=self.election)
+        ElectorRegistry.objects.create(ci=self.persons[3], election_id=ElectionFactory())
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_csv_export_is_streamed_in_chunks(self):
+        response = self.client.get(reverse('electorregistry-export'), {'election_id': self.election.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('elector-registries.csv', response['Content-Disposition'])
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 2)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(lines[0], 'id,ci,election_id')
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], [person.ci for person in self.persons[:3]])
+
+    def test_ndjson_gzip_export(self):
+        response = self.client.get(reverse('person-export'), {'output': 'ndjson', 'gzip': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(self.content(response)).splitlines()]
+        self.assertEqual([row['ci'] for row in rows if row['ci'] in {p.ci for p in self.persons}],
+                         [person.ci for person in self.persons])
+        self.assertEqual(set(rows[0]), {'ci', 'name', 'last_name', 'faculty_id'})
+
+    def test_candidate_results_and_roll(self):
+        candidate = CandidateFactory(election_id=self.election, staff_votes=4)
+        response = self.client.get(reverse('candidate-export'), {'election_id': self.election.id, 'output': 'ndjson'})
+        row = json.loads(self.content(response))
+        self.assertEqual((row['ci'], row['staff_votes']), (candidate.person.ci, 4))
+
+        EligibleElector.objects.create(ci=self.persons[0], election_id=self.election)
+        response = self.client.get(reverse('election-roll', args=[self.election.id]))
+        self.assertEqual(self.content(response).decode().splitlines()[1].split(',')[:2],
+                         [str(self.election.id), self.persons[0].ci])
+
+    def test_export_is_admin_only_and_checks_format(self):
+        self.assertEqual(self.client.get(reverse('person-export'), {'output': 'xml'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=None)
+        self.assertIn(self.client.get(reverse('person-export')).status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_command(self):
+        handle = tempfile.NamedTemporaryFile(suffix='.csv.gz', delete=False)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        call_command('export_data', 'elector-registries', gzip=True, election=self.election.id, file=handle.name,
+                     stdout=io.StringIO())
+        with gzip.open(handle.name, 'rt') as stream:
+            self.assertEqual(len(stream.read().splitlines()), 4)
+
+    def test_command_to_stdout(self):
+        out = io.StringIO()
+        call_command('export_data', 'elector-registries', election=self.election.id, stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[0], 'id,ci,election_id')
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+    def test_csv_escapes_formulas(self):
+        PersonFactory(ci='99999999999', name='=HYPERLINK("http://x")', last_name='-2+3')
+        response = self.client.get(reverse('person-export'))
+        row = next(csv.reader(line for line in self.content(response).decode().splitlines()
+                              if line.startswith('99999999999')))
+        self.assertEqual(row[1:3], ['\'=HYPERLINK("http://x")', "'-2+3"])
+
+
+class CandidateBulkTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superadmin_user = get_user_model().objects.create_superuser(username='admin', password='adminpassword')
+        self.faculty = FacultyFactory()
+        self.election = ElectionFactory()
+        self.url = reverse('candidate-bulk')
+
+    def row(self, ci, **extra):
+        return {'person': {'ci': ci, 'name': 'Ana', 'last_name': 'Pérez', 'faculty_id': self.faculty.id},
+                'election_id': self.election.id, 'who_added': 'committee', 'position': 'Decana', **extra}
+
+    def test_slate_reports_status_per_row(self):
+        existing = PersonFactory()
+        taken = CandidateFactory()
+        rows = [
+            self.row('90020212345'),
+            self.row(existing.ci),
+            self.row('90020212345'),
+            self.row(taken.person.ci),
+            self.row('70030312345', election_id=0),
+            self.row('70030312346', staff_votes=5),
+            {'person': {'ci': 'x' * 12}},
+        ]
+        self.client.force_authenticate(user=self.superadmin_user)
+        response = self.client.post(self.url, {'candidates': rows}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['created', 'created', 'duplicate', 'duplicate', 'not_found', 'invalid', 'invalid'])
+        self.assertEqual(Candidate.objects.filter(election_id=self.election).count(), 2)
+        self.assertEqual(Person.objects.get(ci='90020212345').faculty_id, self.faculty)
+        existing.refresh_from_db()
+        self.assertNotEqual(existing.name, 'Ana')
+
+    def test_query_count_does_not_grow_with_slate(self):
+        self.client.force_authenticate(user=self.superadmin_user)
+        rolls = [ElectionFactory(type='faculty', location_id=self.faculty.id),
+                 ElectionFactory(type='campus', location_id=self.faculty.campus_id_id),
+                 ElectionFactory(type='faculty', location_id=FacultyFactory().id)]
+        for election in rolls:
+            EligibleElector.objects.create(ci=PersonFactory(faculty_id=self.faculty), election_id=election)
+        rows = [self.row(f'9{n:010d}') for n in range(40)]
+        # elecciones, facultades, candidatos, personas, tres INSERT (más el savepoint)
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, {'candidates': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Candidate.objects.filter(election_id=self.election).count(), 40)
+        self.assertEqual(EligibleElector.objects.filter(ci_id='90000000000').count(), 2)
+
+    def test_candidate_manager_only_in_own_election(self):
+        group, _ = Group.objects.get_or_create(name='Candidate Managers')
+        user = CustomUserFactory(election_id=self.election)
+        user.groups.add(group)
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.url, {'candidates': [self.row('90020212345')]}, format='json')
+        self.assertEqual(response.data['results'][0]['status'], 'created')
+
+        other = self.row('90020212346', election_id=ElectionFactory().id)
+        response = self.client.post(self.url, {'candidates': [other]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_slate_without_candidates(self):
+        self.client.force_authenticate(user=self.superadmin_user)
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ArchiveElectionTest(TestCase):
+    def setUp(self):
+        self.election = ElectionFactory(is_active=False)
+        self.candidates = CandidateFactory.create_batch(5, election_id=self.election, staff_votes=2)
+        self.users = CustomUserFactory.create_batch(3, election_id=self.election)
+        self.admin = get_user_model().objects.create_superuser(username='admin', password='adminpassword',
+                                                               election_id=self.election)
+        self.other = CandidateFactory(election_id=ElectionFactory())
+
+    def test_command_moves_rows_in_chunks(self):
+        out = io.StringIO()
+        call_command('archive_election', self.election.id, chunk_size=2, stdout=out)
+
+        self.assertIn('5 candidates and 3 users archived', out.getvalue())
+        self.assertIn('candidates: 4/5', out.getvalue())
+        self.assertFalse(Candidate.objects.filter(election_id=self.election).exists())
+        self.assertTrue(Candidate.objects.filter(pk=self.other.pk).exists())
+        logs = CandidateLog.objects.filter(election_id=self.election)
+        self.assertEqual(set(logs.values_list('person_id', flat=True)), {c.person_id for c in self.candidates})
+        self.assertEqual(set(logs.values_list('staff_votes', flat=True)), {2})
+        self.assertEqual(set(CustomUserLog.objects.values_list('username', flat=True)),
+                         {user.username for user in self.users})
+        self.assertEqual(list(CustomUser.objects.filter(election_id=self.election)), [self.admin])
+
+    @override_settings(VOTE_TALLY_MODE='sharded')
+    def test_sharded_totals_are_folded(self):
+        candidate = self.candidates[0]
+        CandidateVoteCounter.objects.create(candidate=candidate, slot=0, staff_votes=3, president_votes=1)
+        CandidateVoteCounter.objects.create(candidate=candidate, slot=1, staff_votes=4)
+        archive_election(self.election)
+        log = CandidateLog.objects.get(person=candidate.person)
+        self.assertEqual((log.staff_votes, log.president_votes), (7, 1))
+        self.assertFalse(CandidateVoteCounter.objects.exists())
+
+    def test_active_election_needs_force(self):
+        self.election.is_active = True
+        self.election.save()
+        with self.assertRaisesMessage(Exception, 'still active'):
+            call_command('archive_election', self.election.id, stdout=io.StringIO())
+        self.assertEqual(archive_election(self.election, force=True), (5, 3))
+
+
+class LocationNameResolverTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.faculty = FacultyFactory(name='Matemática')
+        self.election = ElectionFactory(type='faculty', location_id=self.faculty.id)
+
+    def test_election_str_is_cached(self):
+        self.assertEqual(str(self.election), 'Elecciones de Facultad en Matemática')
+        with self.assertNumQueries(0):
+            self.assertEqual(str(self.election), 'Elecciones de Facultad en Matemática')
+
+    def test_cache_is_invalidated_on_save_and_delete(self):
+        str(self.election)
+        self.faculty.name = 'Física'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.faculty.save()
+        self.assertEqual(str(self.election), 'Elecciones de Facultad en Física')
+
+        faculty_id = self.faculty.id
+        Person.objects.filter(faculty_id=self.faculty).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.faculty.delete()
+        self.assertEqual(str(self.election), f'Elecciones de Facultad en #{faculty_id}')
+
+    def test_write_from_another_process_retires_the_name(self):
+        str(self.election)
+        # Otro proceso: la fila y su contador cambian sin pasar por este caché
+        Faculty.objects.filter(pk=self.faculty.pk).update(name='Física')
+        ModelVersion.objects.filter(name='elections.faculty').update(version=F('version') + 1)
+        self.assertEqual(str(self.election), 'Elecciones de Facultad en Matemática')
+        cache.delete('model-version:elections.faculty')
+        self.assertEqual(str(self.election), 'Elecciones de Facultad en Física')
+
+    def test_registry_str_uses_loaded_relations(self):
+        ElectorRegistry.objects.create(ci=PersonFactory(), election_id=self.election)
+        registry = ElectorRegistry.objects.select_related('ci', 'election_id').get()
+        str(registry)
+        with self.assertNumQueries(0):
+            self.assertIn('votó en Elecciones de Facultad en Matemática', str(registry))
+
+    def test_admin_changelist_query_count_is_constant(self):
+        self.client.force_login(get_user_model().objects.create_superuser(username='admin', password='adminpassword'))
+        url = reverse('admin:elections_electorregistry_changelist')
+        ElectorRegistry.objects.create(ci=PersonFactory(), election_id=self.election)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for election in ElectionFactory.create_batch(5, type='faculty', location_id=self.faculty.id):
+            ElectorRegistry.objects.create(ci=PersonFactory(), election_id=election)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(many), len(few))
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superadmin_user = get_user_model().objects.create_superuser(username='admin', password='adminpassword')
+        self.election = ElectionFactory()
+        self.candidate = CandidateFactory(election_id=self.election)
+
+    def token(self, person):
+        data = {
+            'elector': {'ci': person.ci, 'election_id': self.election.id},
+            'candidates': {self.candidate.person.ci: {'staff_votes': True, 'president_votes': False}}
+        }
+        return jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+
+    def test_retried_vote_is_replayed(self):
+        url = reverse('electorregistry-list')
+        data = {'token': self.token(PersonFactory())}
+        first = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='kiosk-1-ballot-1')
+
+        with self.assertNumQueries(1):
+            retry = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='kiosk-1-ballot-1')
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.candidate.refresh_from_db()
+        self.assertEqual(self.candidate.staff_votes, 1)
+
+    def test_key_reused_with_other_request(self):
+        url = reverse('electorregistry-list')
+        self.client.post(url, {'token': self.token(PersonFactory())}, format='json', HTTP_IDEMPOTENCY_KEY='reused')
+        response = self.client.post(url, {'token': self.token(PersonFactory())}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='reused')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_keys_are_scoped_per_user(self):
+        self.client.force_authenticate(user=self.superadmin_user)
+        url = reverse('institution-list')
+        self.client.post(url, {'name': 'Universidad'}, format='json', HTTP_IDEMPOTENCY_KEY='same-key')
+        self.client.post(url, {'name': 'Universidad'}, format='json', HTTP_IDEMPOTENCY_KEY='same-key')
+        self.assertEqual(Institution.objects.filter(name='Universidad').count(), 1)
+
+        self.client.force_authenticate(user=get_user_model().objects.create_superuser(username='other',
+                                                                                      password='otherpassword'))
+        self.client.post(url, {'name': 'Universidad'}, format='json', HTTP_IDEMPOTENCY_KEY='same-key')
+        self.assertEqual(Institution.objects.filter(name='Universidad').count(), 2)
+
+    def test_expired_key_runs_again(self):
+        url = reverse('electorregistry-list')
+        data = {'token': self.token(PersonFactory())}
+        self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='expired')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='expired')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_abandoned_claim_is_taken_over(self):
+        self.client.force_authenticate(user=self.superadmin_user)
+        url = reverse('institution-list')
+        self.client.post(url, {'name': 'Universidad'}, format='json', HTTP_IDEMPOTENCY_KEY='crashed')
+        # Como si el worker hubiera muerto antes de guardar la respuesta
+        IdempotencyKey.objects.update(status_code=None, response_body=None,
+                                      locked_until=timezone.now() + timedelta(seconds=30))
+        response = self.client.post(url, {'name': 'Universidad'}, format='json', HTTP_IDEMPOTENCY_KEY='crashed')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        response = self.client.post(url, {'name': 'Universidad'}, format='json', HTTP_IDEMPOTENCY_KEY='crashed')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, status.HTTP_201_CREATED)
+
+    def test_anonymous_keys_are_scoped_per_client(self):
+        url = reverse('electorregistry-list')
+        for address in ('10.0.0.1', '10.0.0.2'):
+            response = self.client.post(url, {'token': self.token(PersonFactory())}, format='json',
+                                        HTTP_IDEMPOTENCY_KEY='ballot-1', REMOTE_ADDR=address)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+@override_settings(VOTE_PROCESSING_MODE='queued')
+class QueuedBallotTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.election = ElectionFactory()
+        self.candidate = CandidateFactory(election_id=self.election)
+
+    def vote(self, ci):
+        data = {
+            'elector': {'ci': ci, 'election_id': self.election.id},
+            'candidates': {self.candidate.person.ci: {'staff_votes': True, 'president_votes': True}}
+        }
+        token = jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+        return self.client.post(reverse('electorregistry-list'), {'token': token}, format='json')
+
+    def receipt_status(self, receipt):
+        return self.client.get(reverse('electorregistry-receipt', kwargs={'receipt': receipt})).data['status']
+
+    def test_ballots_are_committed_in_groups(self):
+        person = PersonFactory()
+        receipts = [self.vote(person.ci).data['receipt'], self.vote(PersonFactory().ci).data['receipt'],
+                    self.vote(person.ci).data['receipt'], self.vote('00000000000').data['receipt']]
+        self.assertEqual(self.receipt_status(receipts[0]), 'queued')
+        self.assertFalse(ElectorRegistry.objects.exists())
+
+        out = io.StringIO()
+        call_command('run_ballot_committer', once=True, group_size=10, stdout=out)
+
+        self.assertIn('4 ballots committed', out.getvalue())
+        self.assertEqual([self.receipt_status(r) for r in receipts], ['accepted', 'accepted', 'duplicate', 'not_found'])
+        self.candidate.refresh_from_db()
+        self.assertEqual((self.candidate.staff_votes, self.candidate.president_votes), (2, 2))
+        self.assertEqual(ElectorRegistry.objects.count(), 2)
+
+    def test_vote_is_acknowledged_with_receipt(self):
+        response = self.vote(PersonFactory().ci)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(PendingBallot.objects.filter(receipt=response.data['receipt']).exists())
+
+    def test_unknown_receipt(self):
+        response = self.client.get(reverse('electorregistry-receipt', kwargs={'receipt': 'abc'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(VOTE_TALLY_MODE='sharded', VOTE_COUNTER_SHARDS=4)
+class ShardedVoteCounterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.election = ElectionFactory()
+        self.candidate_0 = CandidateFactory(election_id=self.election)
+        self.candidate_1 = CandidateFactory(election_id=self.election)
+
+    def vote(self, person, staff_votes=True, president_votes=False):
+        data = {
+            'elector': {'ci': person.ci, 'election_id': self.election.id},
+            'candidates': {
+                self.candidate_0.person.ci: {'staff_votes': staff_votes, 'president_votes': president_votes},
+                self.candidate_1.person.ci: {'staff_votes': False, 'president_votes': president_votes},
+            }
+        }
+        token = jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+        return self.client.post(reverse('electorregistry-list'), {'token': token}, format='json')
+
+    def test_votes_go_to_counter_slots(self):
+        for _ in range(5):
+            self.assertEqual(self.vote(PersonFactory(), president_votes=True).status_code, status.HTTP_201_CREATED)
+
+        self.assertLessEqual(CandidateVoteCounter.objects.filter(candidate=self.candidate_0).count(), 4)
+        totals = Candidate.objects.with_vote_totals().get(pk=self.candidate_0.pk)
+        self.assertEqual(totals.staff_votes_total, 5)
+        self.assertEqual(totals.president_votes_total, 5)
+        # Las columnas del candidato no se tocan en el camino del voto
+        self.candidate_0.refresh_from_db()
+        self.assertEqual(self.candidate_0.staff_votes, 0)
+
+    def test_candidate_list_reads_counter_totals(self):
+        self.vote(PersonFactory())
+        response = self.client.get(reverse('candidate-detail', args=[self.candidate_0.person.ci]))
+        self.assertEqual(response.data['staff_votes'], 1)
+        self.assertEqual(response.data['president_votes'], 0)
+
+    def test_sync_vote_totals(self):
+        self.vote(PersonFactory(), president_votes=True)
+        self.vote(PersonFactory())
+        call_command('sync_vote_totals', election=self.election.id, stdout=io.StringIO())
+
+        self.candidate_0.refresh_from_db()
+        self.candidate_1.refresh_from_db()
+        self.assertEqual(self.candidate_0.staff_votes, 2)
+        self.assertEqual(self.candidate_0.president_votes, 1)
+        self.assertEqual(self.candidate_1.staff_votes, 0)
+        self.assertEqual(self.candidate_1.president_votes, 1)
+
+
+@override_settings(VOTE_TALLY_MODE='ledger', LEDGER_FOLD_LAG_SECONDS=0)
+class BallotLedgerTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.election = ElectionFactory()
+        self.candidate_0 = CandidateFactory(election_id=self.election)
+        self.candidate_1 = CandidateFactory(election_id=self.election)
+
+    def vote(self, person, president_votes=False):
+        data = {
+            'elector': {'ci': person.ci, 'election_id': self.election.id},
+            'candidates': {
+                self.candidate_0.person.ci: {'staff_votes': True, 'president_votes': president_votes},
+                self.candidate_1.person.ci: {'staff_votes': False, 'president_votes': False},
+            }
+        }
+        token = jwt.encode(data, config('SECRET_KEY'), algorithm='HS256')
+        return self.client.post(reverse('electorregistry-list'), {'token': token}, format='json')
+
+    def test_vote_only_appends_to_ledger(self):
+        self.assertEqual(self.vote(PersonFactory(), president_votes=True).status_code, status.HTTP_201_CREATED)
+
+        ballot = Ballot.objects.get()
+        self.assertEqual(ballot.election_id, self.election)
+        self.assertEqual(ballot.selections, [[self.candidate_0.person.ci, 1, 1]])
+        self.candidate_0.refresh_from_db()
+        self.assertEqual(self.candidate_0.staff_votes, 0)
+
+    def test_fold_ballot_ledger_is_incremental(self):
+        self.vote(PersonFactory(), president_votes=True)
+        self.vote(PersonFactory())
+        call_command('fold_ballot_ledger', stdout=io.StringIO())
+        self.vote(PersonFactory())
+        out = io.StringIO()
+        call_command('fold_ballot_ledger', batch_size=1, stdout=out)
+
+        self.assertIn('1 ballots folded', out.getvalue())
+        self.candidate_0.refresh_from_db()
+        self.assertEqual(self.candidate_0.staff_votes, 3)
+        self.assertEqual(self.candidate_0.president_votes, 1)
+        self.assertEqual(TallyCheckpoint.objects.get().last_ballot_id, Ballot.objects.latest('id').id)
+
+    def test_fold_waits_for_late_lower_id_ballot(self):
+        selections = [[self.candidate_0.person.ci, 1, 0]]
+        late = Ballot.objects.create(election_id=self.election, selections=selections, cast_at=timezone.now())
+        Ballot.objects.create(election_id=self.election, selections=selections,
+                              cast_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(fold_ballot_ledger(lag_seconds=60), 0)
+        self.assertEqual(TallyCheckpoint.objects.get().last_ballot_id, 0)
+
+        Ballot.objects.filter(pk=late.pk).update(cast_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(fold_ballot_ledger(lag_seconds=60), 2)
+        self.candidate_0.refresh_from_db()
+        self.assertEqual(self.candidate_0.staff_votes, 2)
+
+    def test_rebuild_candidate_totals(self):
+        self.vote(PersonFactory(), president_votes=True)
+        self.vote(PersonFactory())
+        call_command('fold_ballot_ledger', stdout=io.StringIO())
+        Candidate.objects.update(staff_votes=100, president_votes=100)
+
+        call_command('fold_ballot_ledger', rebuild=True, election=self.election.id, stdout=io.StringIO())
+
+        self.candidate_0.refresh_from_db()
+        self.candidate_1.refresh_from_db()
+        self.assertEqual((self.candidate_0.staff_votes, self.candidate_0.president_votes), (2, 1))
+        self.assertEqual((self.candidate_1.staff_votes, self.candidate_1.president_votes), (0, 0))
+
+
+class ElectionResultsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.election = ElectionFactory(council_size=2)
+        self.first = CandidateFactory(election_id=self.election, staff_votes=10, president_votes=4)
+        self.second = CandidateFactory(election_id=self.election, staff_votes=7, president_votes=1)
+        self.third = CandidateFactory(election_id=self.election, staff_votes=3, president_votes=0)
+        ElectorRegistry.objects.create(ci=PersonFactory(), election_id=self.election)
+        cache.clear()
+
+    def test_results_are_ranked(self):
+        response = self.client.get(reverse('election-results', args=[self.election.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['ci'] for c in response.data['candidates']],
+                         [self.first.pk, self.second.pk, self.third.pk])
+        self.assertEqual([c['elected'] for c in response.data['candidates']], [True, True, False])
+        self.assertEqual(response.data['cutoff_votes'], 7)
+        self.assertEqual(response.data['ballots_cast'], 1)
+        self.assertEqual(response.data['eligible_voters'], 0)
+        self.assertIsNone(response.data['turnout'])
+
+    def test_turnout_uses_eligibility_roll(self):
+        EligibleElector.objects.bulk_create([EligibleElector(election_id=self.election, ci=person)
+                                             for person in PersonFactory.create_batch(4)])
+        response = self.client.get(reverse('election-results', args=[self.election.id]))
+
+        self.assertEqual(response.data['eligible_voters'], 4)
+        self.assertEqual(response.data['turnout'], 0.25)
+
+    def test_results_are_served_from_cache(self):
+        url = reverse('election-results', args=[self.election.id])
+        self.client.get(url)
+        Candidate.objects.filter(pk=self.third.pk).update(staff_votes=50)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['candidates'][0]['ci'], self.first.pk)
+
+        cache.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.data['candidates'][0]['ci'], self.third.pk)
+
+    def test_ballot_commit_refreshes_results(self):
+        url = reverse('election-results', args=[self.election.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            commit_ballot(PersonFactory().ci, self.election.id, {self.third.pk: (20, 0)})
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['ballots_cast'], 2)
+        self.assertEqual(response.data['candidates'][0]['ci'], self.third.pk)
+
+    def test_stale_results_are_served_while_another_process_rebuilds(self):
+        url = reverse('election-results', args=[self.election.id])
+        self.client.get(url)
+        cache.delete(RESULTS_FRESH_KEY.format(self.election.id))
+        cache.add(RESULTS_LOCK_KEY.format(self.election.id), True)
+        Candidate.objects.filter(pk=self.third.pk).update(staff_votes=50)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['candidates'][0]['ci'], self.first.pk)
+
+        cache.delete(RESULTS_LOCK_KEY.format(self.election.id))
+        self.assertEqual(self.client.get(url).data['candidates'][0]['ci'], self.third.pk)
+
+    def test_results_unknown_election(self):
+        response = self.client.get(reverse('election-results', args=[self.election.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(RESULTS_CACHE_TTL=0, RESULTS_STREAM_INTERVAL=0.01)
+class ElectionResultsStreamTest(TestCase):
+    def setUp(self):
+        self.election = ElectionFactory(council_size=3)
+        self.candidate = CandidateFactory(election_id=self.election)
+        self.url = reverse('election-results-stream', args=[self.election.id])
+
+    async def test_stream_pushes_snapshot_then_deltas(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+
+        snapshot = await anext(events)
+        self.assertTrue(snapshot.startswith(b'event: snapshot'))
+
+        await Candidate.objects.filter(pk=self.candidate.pk).aupdate(staff_votes=3)
+        delta = await asyncio.wait_for(anext(events), timeout=5)
+        self.assertTrue(delta.startswith(b'event: delta'))
+        data = json.loads(delta.decode().split('data: ', 1)[1])
+        self.assertEqual(data['candidates'][self.candidate.pk]['staff_votes'], 3)
+        await events.aclose()
+
+    def test_delta_includes_candidates_pushed_down(self):
+        def candidate(ci, staff_votes, rank, elected):
+            return {'ci': ci, 'staff_votes': staff_votes, 'president_votes': 0, 'rank': rank, 'elected': elected}
+
+        previous = {'ballots_cast': 1, 'cutoff_votes': 1, 'candidates': [candidate('a', 1, 1, True),
+                                                                          candidate('b', 0, 2, False)]}
+        current = {'ballots_cast': 3, 'cutoff_votes': 2, 'candidates': [candidate('b', 2, 1, True),
+                                                                         candidate('a', 1, 2, False)]}
+        delta = results_delta(previous, current)
+        self.assertEqual(delta['candidates']['a'], {'staff_votes': 1, 'president_votes': 0, 'rank': 2,
+                                                    'elected': False})
+        self.assertIn('b', delta['candidates'])
+
+    @override_settings(RESULTS_STREAM_INTERVAL=0)
+    def test_channel_survives_errors(self):
+        channel = ElectionChannel(self.election.id)
+        channel.snapshot = {'ballots_cast': 0, 'cutoff_votes': 0, 'candidates': []}
+        subscription = Subscription()
+        channel.subscribers.add(subscription)
+
+        async def first_delta():
+            task = asyncio.ensure_future(channel.run())
+            try:
+                return await subscription.next(5)
+            finally:
+                task.cancel()
+
+        results = {'ballots_cast': 1, 'cutoff_votes': 0, 'candidates': []}
+        with patch('elections.helpers.stream_helpers.get_election_results', side_effect=[RuntimeError, results]), \
+                self.assertLogs('elections.helpers.stream_helpers', 'ERROR'):
+            delta = asyncio.run(first_delta())
+        self.assertEqual(delta['ballots_cast'], 1)
+
+    async def test_stream_unknown_election(self):
+        response = await self.async_client.get(reverse('election-results-stream', args=[self.election.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BenchmarkVotesCommandTest(TransactionTestCase):
+    def test_benchmark_votes_checks_tallies(self):
+        out = io.StringIO()
+        call_command('benchmark_votes', electors=20, candidates=3, workers=1, stdout=out)
+
+        self.assertIn('p95=', out.getvalue())
+        self.assertIn('All 20 ballots accounted for in the tallies', out.getvalue())
+        self.assertFalse(Election.objects.exists())
+        self.assertFalse(Person.objects.exists())
+        self.assertFalse(ConsumedToken.objects.exists())
+        self.assertFalse(ElectorRegistry.objects.exists())
+
+
 class CandidateLogViewSetTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -26,6 +26,7 @@ router = CustomRouter()
 router.register(r'institutions', InstitutionViewSet)
 router.register(r'campuses', CampusViewSet)
 router.register(r'faculties', FacultyViewSet)
+router.register(r'hierarchy', HierarchyViewSet, basename='hierarchy')
 router.register(r'people', PersonViewSet)
 router.register(r'elections', ElectionViewSet)
 router.register(r'candidates', CandidateViewSet)
@@ -33,5 +34,6 @@ router.register(r'elector-registries', ElectorRegistryViewSet)
 router.register(r'candidate-log', CandidateLogViewSet)
 
 urlpatterns = [
+    path('elections/elections/<int:pk>/results/stream/', election_results_stream, name='election-results-stream'),
     path('elections/', include(router.urls)),
 ]
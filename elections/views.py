@@ -1,35 +1,122 @@
-import jwt
-from decouple import config
+import csv
+import io
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
-from .permissions import IsCandidateManagerOrReadOnly, IsReadOnly
-from .permissions import IsSuperUserOrReadOnly
+from .helpers.ballot_helpers import BallotError, commit_ballot, commit_ballots, decode_ballot_token
+from .filters import Filter, parse_bool, parse_moment
+from .helpers.candidate_helpers import register_candidates
+from .helpers.export_helpers import EXPORTS, ExportMixin, export_response
+from .helpers.hierarchy_helpers import HIERARCHY_MODELS, get_hierarchy_tree
+from .helpers.idempotency_helpers import IdempotentViewSetMixin
+from .helpers.import_helpers import PersonImportError, import_persons
+from .helpers.queue_helpers import enqueue_ballot, is_queued_processing
+from .helpers.results_helpers import get_election_results
+from .helpers.search_helpers import search_limit, search_persons
+from .helpers.serializer_helpers import SparseFieldsetMixin, ValuesListMixin
+from .helpers.stream_helpers import stream_election_results
+from .helpers.tally_helpers import is_sharded_tally
+from .helpers.version_helpers import ConditionalGetMixin
+from .pagination import OptionalKeysetPagination
+from .permissions import IsCandidateManagerOrReadOnly, IsReadOnly, IsSlateManager
+from .permissions import IsSuperUser, IsSuperUserOrReadOnly
 from .serializers import *
 
 
-class InstitutionViewSet(viewsets.ModelViewSet):
+class InstitutionViewSet(IdempotentViewSetMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Institution.objects.all()
     serializer_class = InstitutionSerializer
     permission_classes = [IsSuperUserOrReadOnly]
+    versioned_models = (Institution,)
 
 
-class CampusViewSet(viewsets.ModelViewSet):
+class CampusViewSet(IdempotentViewSetMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Campus.objects.all()
     serializer_class = CampusSerializer
     permission_classes = [IsSuperUserOrReadOnly]
+    # ?expand=institution_id anida la institución: su versión también entra en el ETag
+    versioned_models = (Campus, Institution)
 
 
-class FacultyViewSet(viewsets.ModelViewSet):
+class FacultyViewSet(IdempotentViewSetMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Faculty.objects.all()
     serializer_class = FacultySerializer
     permission_classes = [IsSuperUserOrReadOnly]
+    # ?expand=campus_id anida la sede (y con ella la institución)
+    versioned_models = (Faculty, Campus, Institution)
+
+
+class HierarchyViewSet(ConditionalGetMixin, viewsets.ViewSet):
+    """
+    The whole Institution → Campus → Faculty tree in one response;
+    ``?counts=true`` adds person and elector counts per node.
+    """
+    permission_classes = [IsReadOnly]
+    versioned_models = HIERARCHY_MODELS
+
+    def with_counts(self, request):
+        return request.query_params.get('counts') in ('true', '1')
+
+    def is_conditional(self, request):
+        # Los conteos cambian sin tocar la jerarquía, así que no llevan ETag
+        return super().is_conditional(request) and not self.with_counts(request)
 
+    def list(self, request):
+        return HttpResponse(get_hierarchy_tree(self.with_counts(request)), content_type='application/json')
 
-class PersonViewSet(viewsets.ModelViewSet):
+
+class PersonViewSet(IdempotentViewSetMixin, ExportMixin, SparseFieldsetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Person.objects.all()
     serializer_class = PersonSerializer
+    export_name = 'persons'
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = 'ci'
+    filterset_fields = {
+        'faculty_id': Filter('faculty_id', int),
+    }
+    # last_name se resuelve con el índice (faculty_id, last_name) al filtrar por facultad
+    ordering_fields = ['ci', 'last_name']
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Desk lookup of electors by partial name or CI prefix: ``?q=`` with at
+        least two characters, ``?limit=`` capped by ``PERSON_SEARCH_MAX_LIMIT``.
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            return Response({'error': 'Search needs at least 2 characters'}, status=status.HTTP_400_BAD_REQUEST)
+        persons = search_persons(query, search_limit(request.query_params.get('limit')))
+        return Response({'results': [{**PersonSerializer(person).data, 'rank': person.rank} for person in persons]})
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', permission_classes=[IsSuperUser],
+            parser_classes=[MultiPartParser])
+    def import_roll(self, request):
+        """
+        Bulk load of the person roll from an uploaded CSV (``file``), upserted
+        by ``ci``. ``skip_invalid=true`` imports the valid rows even when some
+        are rejected.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'File not provided'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            summary = import_persons(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''),
+                                     skip_invalid=request.data.get('skip_invalid') in ('true', '1'))
+        except PersonImportError as e:
+            return Response(e.summary, status=status.HTTP_400_BAD_REQUEST)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Unreadable CSV: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_200_OK)
 
     def update(self, request, *args, **kwargs):
         try:
@@ -43,52 +130,170 @@ class PersonViewSet(viewsets.ModelViewSet):
             return Response({"error": "Error updating Person"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class ElectionViewSet(viewsets.ModelViewSet):
+class ElectionViewSet(IdempotentViewSetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Election.objects.all()
     serializer_class = ElectionSerializer
     permission_classes = [IsSuperUserOrReadOnly]
+    filterset_fields = {
+        'is_active': Filter('is_active', parse_bool),
+        'type': Filter('type'),
+        'location_id': Filter('location_id', int),
+        'voting_date_after': Filter('voting_date__gte', parse_moment),
+        'voting_date_before': Filter('voting_date__lte', parse_moment),
+    }
+    ordering_fields = ['voting_date']
 
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        """
+        Live results: ranked candidates, turnout and the council seat cutoff,
+        served from a short-lived cache so polling dashboards rarely hit the DB.
+        """
+        try:
+            return Response(get_election_results(int(pk)))
+        except (ValueError, Election.DoesNotExist):
+            return Response({'error': 'Election not found'}, status=status.HTTP_404_NOT_FOUND)
 
-class CandidateViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'], permission_classes=[IsSuperUser])
+    def roll(self, request, pk=None):
+        """Eligibility roll of the election as a CSV or NDJSON download, streamed like the exports."""
+        election = self.get_object()
+        return export_response(request, EXPORTS['eligible-electors'],
+                               EligibleElector.objects.filter(election_id=election))
+
+
+@require_GET
+async def election_results_stream(request, pk):
+    """
+    Server-Sent Events stream of an election's results. Meant to be served by
+    the ASGI application so each dashboard holds one long-lived connection.
+    """
+    if not await Election.objects.filter(pk=pk).aexists():
+        return JsonResponse({'error': 'Election not found'}, status=status.HTTP_404_NOT_FOUND)
+    response = StreamingHttpResponse(stream_election_results(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class CandidateViewSet(IdempotentViewSetMixin, ExportMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
+    export_name = 'candidates'
     permission_classes = [IsCandidateManagerOrReadOnly]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = 'person_id'
+    filterset_fields = {
+        'election_id': Filter('election_id', int),
+        'who_added': Filter('who_added'),
+        # Lo resuelve el índice (faculty_id, last_name) de la persona y la PK del candidato
+        'faculty_id': Filter('person__faculty_id', int),
+    }
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if is_sharded_tally():
+            queryset = queryset.with_vote_totals()
+        return queryset
 
+    @action(detail=False, methods=['post'], permission_classes=[IsSlateManager])
+    def bulk(self, request):
+        """
+        Register a whole slate (``candidates``, rows shaped like a single
+        create) in one request and report the outcome of each row, in order.
+        """
+        rows = request.data.get('candidates') if isinstance(request.data, dict) else None
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Candidates not provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.CANDIDATE_BULK_MAX_SIZE:
+            return Response({'error': f'At most {settings.CANDIDATE_BULK_MAX_SIZE} candidates per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = register_candidates(rows)
+        except IntegrityError:
+            return Response({'error': 'The slate changed while it was being registered, retry'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
-class ElectorRegistryViewSet(viewsets.ModelViewSet):
+
+class ElectorRegistryViewSet(IdempotentViewSetMixin, ExportMixin, SparseFieldsetMixin, ValuesListMixin,
+                             viewsets.ModelViewSet):
     queryset = ElectorRegistry.objects.all()
     serializer_class = ElectorRegistrySerializer
+    export_name = 'elector-registries'
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = 'id'
+    filterset_fields = {
+        'election_id': Filter('election_id', int),
+        'ci': Filter('ci'),
+    }
+    ordering_fields = ['id']
 
     def create(self, request, *args, **kwargs):
         if 'token' not in request.data:
             return Response({'error': 'Token not provided'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            data = jwt.decode(request.data['token'], config('SECRET_KEY'), algorithms=['HS256'])
-        except jwt.ExpiredSignatureError:
-            return Response({'error': 'Token has expired'}, status=status.HTTP_401_UNAUTHORIZED)
-        except jwt.InvalidTokenError:
-            return Response({'error': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
+            ballot = decode_ballot_token(request.data['token'])
+            if is_queued_processing():
+                receipt = enqueue_ballot(*ballot)
+                return Response({'message': 'Ballot queued', 'receipt': str(receipt)},
+                                status=status.HTTP_202_ACCEPTED)
+            commit_ballot(*ballot)
+        except BallotError as e:
+            return Response({'error': e.message}, status=e.status_code)
 
-        candidates = Candidate.objects.filter(pk__in=data['candidates'].keys())
-        elector = Person.objects.get(ci=data['elector']['ci'])
-        election = Election.objects.get(pk=data['elector']['election_id'])
+        return Response({'message': 'Voting successfully completed!!!'}, status=status.HTTP_201_CREATED)
 
-        for candidate in candidates:
-            votes = data['candidates'][str(candidate.pk)]
-            candidate.staff_votes += 1 if votes['staff_votes'] else 0
-            candidate.president_votes += 1 if votes['president_votes'] else 0
+    @action(detail=False, methods=['get'], url_path=r'receipts/(?P<receipt>[0-9a-fA-F-]+)')
+    def receipt(self, request, receipt=None):
+        """
+        Outcome of a ballot accepted in queued mode: ``queued`` until the
+        committer processes it, then ``accepted`` or the rejection code.
+        """
+        try:
+            pending = (PendingBallot.objects.filter(receipt=uuid.UUID(receipt))
+                       .values('receipt', 'status', 'error', 'processed_at').first())
+        except ValueError:
+            pending = None
+        if pending is None:
+            return Response({'error': 'Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(pending)
 
-        Candidate.objects.bulk_update(candidates, ['staff_votes', 'president_votes'])
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Ingest a kiosk backlog of signed ballot tokens in one request and
+        report the outcome of each ballot, in the order received.
+        """
+        tokens = request.data.get('tokens')
+        if not isinstance(tokens, list) or not tokens:
+            return Response({'error': 'Tokens not provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(tokens) > settings.BALLOT_BATCH_MAX_SIZE:
+            return Response({'error': f'At most {settings.BALLOT_BATCH_MAX_SIZE} tokens per batch'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        new_registry = ElectorRegistry(ci=elector, election_id=election)
-        new_registry.save()
+        ballots = []
+        for token in tokens:
+            try:
+                ballots.append(decode_ballot_token(token))
+            except BallotError as e:
+                ballots.append(e)
 
-        return Response({'message': 'Voting successfully completed!!!'}, status=status.HTTP_201_CREATED)
+        results = []
+        for result in commit_ballots(ballots):
+            if isinstance(result, BallotError):
+                results.append({'status': result.code, 'error': result.message})
+            else:
+                results.append({'status': 'accepted'})
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
 
-class CandidateLogViewSet(viewsets.ModelViewSet):
+class CandidateLogViewSet(IdempotentViewSetMixin, SparseFieldsetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = CandidateLog.objects.all()
     serializer_class = CandidateLogSerializer
-    permission_classes = [IsReadOnly]
\ No newline at end of file
+    permission_classes = [IsReadOnly]
+    filterset_fields = {
+        'election_id': Filter('election_id', int),
+        'who_added': Filter('who_added'),
+    }
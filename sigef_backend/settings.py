@@ -89,6 +89,13 @@ DATABASES = {
         'PORT': config('POSTGRES_PORT', default='', cast=int),
     }
 }
+# Point at Redis or Memcached in production so every worker shares the caches (results, versions, names)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
 AUTH_USER_MODEL = 'user_management.CustomUser'
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -97,6 +104,19 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'elections.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'elections.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'elections.filters.IndexedFilterBackend',
+        'elections.filters.IndexedOrderingFilter',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
@@ -109,6 +129,74 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Vote tallying
+# 'direct' increments Candidate.staff_votes/president_votes in place.
+# 'sharded' spreads increments over VOTE_COUNTER_SHARDS counter rows per candidate;
+# Candidate totals are then refreshed with `manage.py sync_vote_totals`.
+# 'ledger' only appends to the ballot ledger; `manage.py fold_ballot_ledger` folds
+# new ballots into the Candidate totals in batches of LEDGER_FOLD_BATCH_SIZE,
+# skipping ballots younger than LEDGER_FOLD_LAG_SECONDS so in-flight transactions
+# are not passed over by the high-water mark.
+# Do not switch modes while an election is open.
+VOTE_TALLY_MODE = config('VOTE_TALLY_MODE', default='direct')
+VOTE_COUNTER_SHARDS = config('VOTE_COUNTER_SHARDS', default=16, cast=int)
+LEDGER_FOLD_BATCH_SIZE = config('LEDGER_FOLD_BATCH_SIZE', default=5000, cast=int)
+LEDGER_FOLD_LAG_SECONDS = config('LEDGER_FOLD_LAG_SECONDS', default=5, cast=int)
+# Maximum number of ballot tokens accepted by elector-registries/batch/
+BALLOT_BATCH_MAX_SIZE = config('BALLOT_BATCH_MAX_SIZE', default=1000, cast=int)
+# Candidates accepted in one bulk registration request
+CANDIDATE_BULK_MAX_SIZE = config('CANDIDATE_BULK_MAX_SIZE', default=1000, cast=int)
+# Vote processing: 'sync' commits each ballot in the request; 'queued' journals it in
+# pending_ballot, answers 202 with a receipt, and leaves the commit to
+# `manage.py run_ballot_committer`, which commits BALLOT_QUEUE_GROUP_SIZE ballots per
+# transaction. BALLOT_QUEUE_DURABILITY='durable' acknowledges a ballot only once the
+# journal row is flushed to disk; 'relaxed' (PostgreSQL) skips waiting for the flush,
+# so a database crash can lose the most recently acknowledged ballots.
+VOTE_PROCESSING_MODE = config('VOTE_PROCESSING_MODE', default='sync')
+BALLOT_QUEUE_GROUP_SIZE = config('BALLOT_QUEUE_GROUP_SIZE', default=500, cast=int)
+BALLOT_QUEUE_DURABILITY = config('BALLOT_QUEUE_DURABILITY', default='durable')
+# Seconds a stored Idempotency-Key response is replayed to retries of the same write request
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+# Seconds an in-progress Idempotency-Key stays locked; after that a retry takes it over (above the worker timeout)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+# Seconds the live results of an election are served from the cache before being rebuilt
+RESULTS_CACHE_TTL = config('RESULTS_CACHE_TTL', default=2, cast=int)
+# Seconds the last results stay available to serve while a single process rebuilds them
+RESULTS_STALE_TTL = config('RESULTS_STALE_TTL', default=60, cast=int)
+RESULTS_REBUILD_LOCK_TIMEOUT = config('RESULTS_REBUILD_LOCK_TIMEOUT', default=10, cast=int)
+# Live results stream (ASGI): seconds between pushed updates, and between keep-alive comments
+RESULTS_STREAM_INTERVAL = config('RESULTS_STREAM_INTERVAL', default=1, cast=float)
+RESULTS_STREAM_KEEPALIVE = config('RESULTS_STREAM_KEEPALIVE', default=15, cast=float)
+# Ballot token verification: verified tokens kept per process, and sizing of the
+# in-memory filter of consumed token ids (jti) used to reject replays early.
+BALLOT_TOKEN_CACHE_SIZE = config('BALLOT_TOKEN_CACHE_SIZE', default=10000, cast=int)
+BALLOT_REPLAY_FILTER_CAPACITY = config('BALLOT_REPLAY_FILTER_CAPACITY', default=1000000, cast=int)
+BALLOT_REPLAY_FILTER_ERROR_RATE = config('BALLOT_REPLAY_FILTER_ERROR_RATE', default=0.001, cast=float)
+# Seconds between reads of the tokens consumed by other workers into the replay filter
+BALLOT_REPLAY_FILTER_REFRESH = config('BALLOT_REPLAY_FILTER_REFRESH', default=5, cast=int)
+# Render the read-heavy list endpoints straight from .values() rows instead of model serializers
+FAST_LIST_SERIALIZATION = config('FAST_LIST_SERIALIZATION', default=True, cast=bool)
+# Rows encoded per chunk when a list is streamed (?stream=true)
+JSON_STREAM_CHUNK_SIZE = config('JSON_STREAM_CHUNK_SIZE', default=500, cast=int)
+# Seconds a model write counter (ETags of institutions, campuses, faculties) is served from the cache
+MODEL_VERSION_CACHE_TTL = config('MODEL_VERSION_CACHE_TTL', default=1, cast=int)
+# Seconds an election location name is cached (a write to the location model retires it earlier)
+LOCATION_NAME_CACHE_TTL = config('LOCATION_NAME_CACHE_TTL', default=300, cast=int)
+# Seconds the hierarchy tree with person and elector counts is cached (the plain tree lives until a write)
+HIERARCHY_COUNTS_CACHE_TTL = config('HIERARCHY_COUNTS_CACHE_TTL', default=30, cast=int)
+# People search (people/search/?q=): default and maximum number of results
+PERSON_SEARCH_LIMIT = config('PERSON_SEARCH_LIMIT', default=20, cast=int)
+PERSON_SEARCH_MAX_LIMIT = config('PERSON_SEARCH_MAX_LIMIT', default=100, cast=int)
+# Person roll import: rows validated and loaded per chunk, and invalid rows reported back
+PERSON_IMPORT_CHUNK_SIZE = config('PERSON_IMPORT_CHUNK_SIZE', default=5000, cast=int)
+PERSON_IMPORT_MAX_ERRORS = config('PERSON_IMPORT_MAX_ERRORS', default=100, cast=int)
+# Only accept ballots from people on the election eligibility roll (generate_eligibility_roll)
+ENFORCE_ELIGIBILITY = config('ENFORCE_ELIGIBILITY', default=False, cast=bool)
+# Rows fetched per server-side cursor round trip and encoded per chunk by the CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+# Rows moved to the log tables per transaction when an election is archived
+ARCHIVE_CHUNK_SIZE = config('ARCHIVE_CHUNK_SIZE', default=1000, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -3,14 +3,23 @@ from rest_framework import permissions
 
 class IsUserManager(permissions.BasePermission):
     """
-    Custom permission to only allow candidate managers to modify candidates.
+    Superusers manage every user. Other authenticated users may only read and
+    update their own user: never delete it, nor change its privileges or the
+    person (and ``ci``) it belongs to.
     """
+    self_service_methods = (*permissions.SAFE_METHODS, 'PUT', 'PATCH')
+    blocked_fields = ('is_superuser', 'is_staff', 'groups', 'election_id', 'person')
 
     def has_permission(self, request, view):
         user = request.user
-        is_user_authenticated = user.is_authenticated
-        is_superuser = user.is_superuser
-        if is_user_authenticated:
-            is_current_user = user.ci == request.data.get('ci') or user.ci == view.kwargs.get('pk')
-            return is_superuser or is_current_user
-        return False
+        if not user.is_authenticated:
+            return False
+        if user.is_superuser:
+            return True
+        # Solo rutas de detalle: la comprobación del objeto decide si es el propio usuario
+        if 'pk' not in view.kwargs or request.method not in self.self_service_methods:
+            return False
+        return not any(field in request.data for field in self.blocked_fields)
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_superuser or obj.pk == request.user.pk
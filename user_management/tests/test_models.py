@@ -11,8 +11,13 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from django.utils import timezone
 
-from elections.tests.factory.models_factory import PersonFactory, ElectionFactory
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from elections.helpers.serializer_helpers import values_serializer_for
+from elections.tests.factory.models_factory import PersonFactory, ElectionFactory, CustomUserFactory
 from user_management.models import CustomUser, CustomUserLog
+from user_management.serializers import CustomUserLogSerializer, CustomUserSerializer
 
 
 class UserManagerTests(TestCase):
@@ -72,6 +77,92 @@ class CustomUserTests(TestCase):
 
 User = get_user_model()
 
+
+class ValuesSerializerParityTest(TestCase):
+    def test_parity_with_user_serializers(self):
+        election = ElectionFactory()
+        users = CustomUserFactory.create_batch(2) + [CustomUser.objects.create(username='sin-persona')]
+        for user in users:
+            CustomUserLog.objects.create(person=user.person, username=user.username, date_joined=timezone.now(),
+                                         election_id=election)
+        for serializer_class, queryset in ((CustomUserSerializer, CustomUser.objects.order_by('id')),
+                                           (CustomUserLogSerializer, CustomUserLog.objects.order_by('id'))):
+            values_serializer = values_serializer_for(serializer_class)
+            self.assertEqual(values_serializer.render_many(values_serializer.values(queryset)),
+                             serializer_class(queryset, many=True).data)
+
+
+class UserQueryBudgetTest(TestCase):
+    LIST_BUDGETS = {
+        'user-list': 2,
+        'customuserlog-list': 2,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_superuser(username='admin',
+                                                                                       password='adminpassword'))
+
+    def test_list_budgets(self):
+        for rows in (2, 12):
+            for _ in range(rows - CustomUser.objects.filter(person__isnull=False).count()):
+                user = CustomUserFactory()
+                CustomUserLog.objects.create(person=user.person, username=user.username, date_joined=timezone.now(),
+                                             election_id=user.election_id)
+            for name, budget in self.LIST_BUDGETS.items():
+                with self.subTest(endpoint=name, rows=rows):
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(reverse(name))
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertLessEqual(len(queries), budget)
+
+
+class UserPermissionTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUserFactory(is_staff=False)
+        self.other = CustomUserFactory()
+        self.client.force_authenticate(user=self.user)
+
+    def test_user_cannot_grant_privileges(self):
+        url = reverse('user-detail', args=[self.user.pk])
+        for data in ({'ci': self.user.person_id, 'is_superuser': True}, {'is_staff': True},
+                     {'election_id': self.other.election_id_id}, {'groups': [1]}):
+            with self.subTest(data=data):
+                response = self.client.patch(url, data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_superuser or self.user.is_staff)
+
+    def test_user_cannot_delete_own_account(self):
+        response = self.client.delete(reverse('user-detail', args=[self.user.pk]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(CustomUser.objects.filter(pk=self.user.pk).exists())
+
+    def test_user_cannot_change_own_person(self):
+        response = self.client.patch(reverse('user-detail', args=[self.user.pk]),
+                                     {'person': {'ci': '99999999999', 'name': 'Otra', 'last_name': 'Persona'}},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.person_id, '99999999999')
+
+    def test_user_cannot_write_other_users(self):
+        response = self.client.patch(reverse('user-detail', args=[self.other.pk]),
+                                     {'ci': self.user.person_id, 'username': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.other.refresh_from_db()
+        self.assertNotEqual(self.other.username, 'renamed')
+        self.assertEqual(self.client.get(reverse('user-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_updates_own_username(self):
+        response = self.client.patch(reverse('user-detail', args=[self.user.pk]), {'username': 'renamed'},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, 'renamed')
+
+
 class CustomUserLogViewSetTest(TestCase):
    def setUp(self):
        self.client = APIClient()
@@ -113,4 +204,20 @@ class CustomUserLogViewSetTest(TestCase):
        custom_user_log = CustomUserLog.objects.create(person=PersonFactory(), username='testuser', date_joined=timezone.now(), is_staff=False, is_superuser=False, election_id=ElectionFactory())
        url = reverse('customuserlog-detail', kwargs={'pk': custom_user_log.id})
        response = self.client.delete(url)
-       self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+       self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+   def test_create_custom_user_log_with_idempotency_key(self):
+       url = reverse('customuserlog-list')
+       data = {
+           'person': PersonFactory().ci,
+           'username': 'testuser',
+           'date_joined': timezone.now(),
+           'is_staff': False,
+           'is_superuser': False,
+           'election_id': ElectionFactory().id,
+       }
+       first = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='log-1')
+       retry = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='log-1')
+       self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+       self.assertEqual(retry.data, first.data)
+       self.assertEqual(CustomUserLog.objects.filter(username='testuser').count(), 1)
@@ -2,13 +2,16 @@ from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from elections.helpers.idempotency_helpers import IdempotentViewSetMixin
+from elections.helpers.serializer_helpers import ValuesListMixin
+
 from .models import CustomUser, CustomUserLog
 from .serializers import CustomUserSerializer, CustomUserLogSerializer
 from .permissions import IsUserManager
 
 
-class CustomUserViewSet(viewsets.ModelViewSet):
-    queryset = CustomUser.objects.all()
+class CustomUserViewSet(IdempotentViewSetMixin, ValuesListMixin, viewsets.ModelViewSet):
+    queryset = CustomUser.objects.select_related('person')
     serializer_class = CustomUserSerializer
     permission_classes = [IsUserManager]
 
@@ -23,6 +26,6 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         response.data['username'] = user.username
         return response
 
-class CustomUserLogViewSet(viewsets.ModelViewSet):
+class CustomUserLogViewSet(IdempotentViewSetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = CustomUserLog.objects.all()
     serializer_class = CustomUserLogSerializer
\ No newline at end of file